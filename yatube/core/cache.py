@@ -0,0 +1,236 @@
+# core/cache.py
+"""
+Общий для всех процессов кэш в файле SQLite, без внешних сервисов.
+
+Защита от лавины пересчётов (cache stampede):
+- вероятностное досрочное истечение (XFetch): запись считается
+  устаревшей чуть раньше срока, тем вероятнее, чем ближе срок и чем
+  дольше её пересчитывали в прошлый раз (delta);
+- замок на ключ: устаревшую запись пересчитывает только тот, кто взял
+  замок, остальные ещё STALE_TIMEOUT секунд получают старое значение.
+
+Подключение:
+    CACHES = {'default': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': '/path/to/cache.sqlite3',
+        'OPTIONS': {'STALE_TIMEOUT': 300, 'LOCK_TIMEOUT': 30, 'BETA': 1},
+    }}
+"""
+import math
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .perf import CacheStatsMixin
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS entries ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL, '
+    'delta REAL NOT NULL DEFAULT 0)',
+    'CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires)',
+    'CREATE TABLE IF NOT EXISTS locks ('
+    'key TEXT PRIMARY KEY, acquired REAL NOT NULL)',
+)
+# Доля вызовов set(), после которых чистятся просроченные записи.
+CULL_PROBABILITY = 0.01
+
+
+class SQLiteBackend(BaseCache):
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._stale_timeout = options.get('STALE_TIMEOUT', 300)
+        self._lock_timeout = options.get('LOCK_TIMEOUT', 30)
+        self._beta = options.get('BETA', 1)
+        self._local = threading.local()
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        # Соединение своё у каждого потока и у каждого процесса после fork.
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(
+                self._path, timeout=self._lock_timeout,
+                isolation_level=None,
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _is_fresh(self, expires, delta, now) -> bool:
+        if expires is None:
+            return True
+        # XFetch: now - delta * beta * ln(rand) >= expires.
+        jitter = delta * self._beta * -math.log(1 - random.random())
+        return now + jitter < expires
+
+    def _acquire(self, key: str, now: float) -> bool:
+        """Берёт замок на пересчёт ключа; True - замок наш."""
+        with self._transaction() as connection:
+            connection.execute(
+                'DELETE FROM locks WHERE key = ? AND acquired < ?',
+                (key, now - self._lock_timeout),
+            )
+            inserted = connection.execute(
+                'INSERT OR IGNORE INTO locks (key, acquired) VALUES (?, ?)',
+                (key, now),
+            )
+            return inserted.rowcount == 1
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        row = self._connection.execute(
+            'SELECT value, expires, delta FROM entries WHERE key = ?', (key,)
+        ).fetchone()
+        now = time.time()
+        if row is None:
+            # Замок всё равно берём: по нему set() узнает время пересчёта.
+            self._acquire(key, now)
+            return default
+        value, expires, delta = row
+        if self._is_fresh(expires, delta, now):
+            return pickle.loads(value)
+        if self._acquire(key, now) or now > expires + self._stale_timeout:
+            return default
+        # Пересчитывает другой процесс - отдаём устаревшее значение.
+        return pickle.loads(value)
+
+    def _store(self, connection, key, value, timeout, now):
+        lock = connection.execute(
+            'SELECT acquired FROM locks WHERE key = ?', (key,)
+        ).fetchone()
+        connection.execute('DELETE FROM locks WHERE key = ?', (key,))
+        expires = self.get_backend_timeout(timeout)
+        if expires is not None and expires <= now:
+            connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+            return
+        if lock is not None:
+            delta = now - lock[0]
+        else:
+            previous = connection.execute(
+                'SELECT delta FROM entries WHERE key = ?', (key,)
+            ).fetchone()
+            delta = previous[0] if previous else 0
+        connection.execute(
+            'INSERT OR REPLACE INTO entries (key, value, expires, delta) '
+            'VALUES (?, ?, ?, ?)',
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+             expires, delta),
+        )
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as connection:
+            self._store(connection, key, value, timeout, now)
+            if random.random() < CULL_PROBABILITY:
+                self._cull(connection, now)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as connection:
+            if self._fresh_row(connection, key, now) is not None:
+                return False
+            self._store(connection, key, value, timeout, now)
+            return True
+
+    def _fresh_row(self, connection, key, now):
+        return connection.execute(
+            'SELECT value FROM entries WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, now),
+        ).fetchone()
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        with self._transaction() as connection:
+            row = self._fresh_row(connection, key, time.time())
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                'UPDATE entries SET value = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key),
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._transaction() as connection:
+            updated = connection.execute(
+                'UPDATE entries SET expires = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), key, time.time()),
+            )
+            return updated.rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._fresh_row(self._connection, key, time.time()) is not None
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+            connection.execute('DELETE FROM locks WHERE key = ?', (key,))
+
+    def clear(self):
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM entries')
+            connection.execute('DELETE FROM locks')
+
+    def _cull(self, connection, now):
+        connection.execute(
+            'DELETE FROM entries WHERE expires < ?',
+            (now - self._stale_timeout,),
+        )
+        connection.execute(
+            'DELETE FROM locks WHERE acquired < ?',
+            (now - self._lock_timeout,),
+        )
+        count = connection.execute('SELECT COUNT(*) FROM entries').fetchone()
+        excess = count[0] - self._max_entries
+        if excess > 0:
+            # Как и LocMemCache, выкидываем сразу долю записей.
+            connection.execute(
+                'DELETE FROM entries WHERE key IN (SELECT key FROM entries '
+                'ORDER BY expires IS NULL, expires LIMIT ?)',
+                (max(excess, count[0] // self._cull_frequency),),
+            )
+
+    def close(self, **kwargs):
+        # Соединение переиспользуется между запросами потока.
+        pass
+
+
+class SQLiteCache(CacheStatsMixin, SQLiteBackend):
+    """SQLiteBackend с подсчётом попаданий для Server-Timing."""
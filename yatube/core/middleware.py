@@ -0,0 +1,85 @@
+# core/middleware.py
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import perf
+
+logger = logging.getLogger('yatube.perf')
+
+
+class PerformanceMiddleware:
+    """
+    Для выбранных запросов (PERF_SAMPLE_RATE) замеряет SQL, шаблоны,
+    миниатюры и кэш. Итог уходит в заголовок Server-Timing (если
+    включён PERF_SERVER_TIMING) и строкой JSON в лог yatube.perf с
+    уровнем DEBUG; запросы дольше PERF_SLOW_REQUEST_MS пишутся с
+    уровнем WARNING.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.PERF_SAMPLE_RATE:
+            return self.get_response(request)
+        with perf.collecting() as collector, ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(perf.query_wrapper)
+                )
+            started = time.perf_counter()
+            response = self.get_response(request)
+            total = time.perf_counter() - started
+        metrics = self.metrics(collector, total)
+        if settings.PERF_SERVER_TIMING:
+            response['Server-Timing'] = self.server_timing(metrics)
+        self.log(request, response, metrics)
+        return response
+
+    @staticmethod
+    def metrics(collector: perf.Collector, total: float) -> dict:
+        def ms(seconds):
+            return round(seconds * 1000, 2)
+
+        return {
+            'total_ms': ms(total),
+            'db_ms': ms(collector.timings['db']),
+            'db_queries': collector.counts['db'],
+            'template_ms': ms(collector.timings['tpl']),
+            'thumbnail_ms': ms(collector.timings['thumbnail']),
+            'cache_hits': collector.counts['cache_hit'],
+            'cache_misses': collector.counts['cache_miss'],
+        }
+
+    @staticmethod
+    def server_timing(metrics: dict) -> str:
+        return ', '.join([
+            f'db;dur={metrics["db_ms"]};desc="{metrics["db_queries"]} SQL"',
+            f'tpl;dur={metrics["template_ms"]};desc="Templates"',
+            f'thumb;dur={metrics["thumbnail_ms"]};desc="Thumbnails"',
+            f'cache;desc="hit={metrics["cache_hits"]} '
+            f'miss={metrics["cache_misses"]}"',
+            f'total;dur={metrics["total_ms"]}',
+        ])
+
+    @staticmethod
+    def log(request, response, metrics: dict) -> None:
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            **metrics,
+        }
+        slow = metrics['total_ms'] >= settings.PERF_SLOW_REQUEST_MS
+        logger.log(
+            logging.WARNING if slow else logging.DEBUG,
+            json.dumps(record, ensure_ascii=False),
+        )
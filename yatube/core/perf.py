@@ -0,0 +1,112 @@
+# core/perf.py
+"""
+Замеры одного запроса: время SQL, шаблонов, миниатюр, попадания в кэш.
+
+Сборщик живёт в threading.local и существует, только пока
+PerformanceMiddleware обрабатывает запрос, выбранный в выборку;
+вне запроса (фоновые задачи, команды) все замеры ничего не делают.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.template.backends.django import DjangoTemplates, Template
+
+_local = threading.local()
+_MISSING = object()
+
+
+class Collector:
+    """Накопленные за запрос длительности (секунды) и счётчики."""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = defaultdict(float)
+        self.counts: Dict[str, int] = defaultdict(int)
+
+
+def current() -> Optional[Collector]:
+    return getattr(_local, 'collector', None)
+
+
+@contextmanager
+def collecting():
+    collector = Collector()
+    _local.collector = collector
+    try:
+        yield collector
+    finally:
+        _local.collector = None
+
+
+def count(name: str, value: int = 1) -> None:
+    collector = current()
+    if collector is not None:
+        collector.counts[name] += value
+
+
+@contextmanager
+def timer(name: str):
+    """Прибавляет длительность блока к замеру name."""
+    collector = current()
+    if collector is None:
+        yield
+        return
+    # Вложенные замеры одного вида (include внутри шаблона) не
+    # суммируются дважды.
+    depth_key = f'{name}:depth'
+    collector.counts[depth_key] += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        collector.counts[depth_key] -= 1
+        if not collector.counts[depth_key]:
+            collector.timings[name] += time.perf_counter() - started
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """Обёртка для connection.execute_wrapper: время и число запросов."""
+    count('db')
+    with timer('db'):
+        return execute(sql, params, many, context)
+
+
+class TimedTemplate(Template):
+
+    def render(self, context=None, request=None):
+        with timer('tpl'):
+            return super().render(context, request)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Шаблонный движок Django, который замеряет время отрисовки."""
+
+    def from_string(self, template_code):
+        template = super().from_string(template_code)
+        return TimedTemplate(template.template, self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+class CacheStatsMixin:
+    """
+    Считает попадания и промахи get(). BaseCache.get_many() сам
+    вызывает get(), поэтому отдельно его не считаем.
+    """
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            count('cache_miss')
+            return default
+        count('cache_hit')
+        return value
+
+
+class InstrumentedLocMemCache(CacheStatsMixin, LocMemCache):
+    pass
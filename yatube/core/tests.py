@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from .cache import SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.worker()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def worker(self):
+        """Отдельный экземпляр кэша - как в другом процессе."""
+        return SQLiteCache(self.location, {
+            'OPTIONS': {'STALE_TIMEOUT': 60, 'LOCK_TIMEOUT': 5},
+        })
+
+    def test_shared_between_instances(self):
+        """Тест значения и инкременты видны всем экземплярам"""
+        self.cache.set('page', {'posts': [1, 2]})
+        self.assertEqual(self.worker().get('page'), {'posts': [1, 2]})
+        self.assertTrue(self.cache.add('version', 1, None))
+        self.assertFalse(self.worker().add('version', 5, None))
+        self.worker().incr('version')
+        self.assertEqual(self.cache.get('version'), 2)
+        self.cache.delete('page')
+        self.assertIsNone(self.worker().get('page'))
+
+    def test_incr_missing_key(self):
+        """Тест incr несуществующего ключа - ValueError"""
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_only_lock_holder_recomputes(self):
+        """Тест истёкшую запись пересчитывает один, другим - старая"""
+        self.cache.set('page', 'old', 1)
+        first, second = self.worker(), self.worker()
+        with mock.patch('core.cache.time.time',
+                        return_value=time.time() + 2):
+            self.assertIsNone(first.get('page'))
+            self.assertEqual(second.get('page'), 'old')
+            first.set('page', 'new', 100)
+            self.assertEqual(second.get('page'), 'new')
+
+    def test_stale_value_has_limit(self):
+        """Тест после STALE_TIMEOUT старое значение не отдаётся"""
+        self.cache.set('page', 'old', 1)
+        with mock.patch('core.cache.time.time',
+                        return_value=time.time() + 100):
+            self.assertIsNone(self.worker().get('page'))
+            self.assertIsNone(self.worker().get('page'))
+
+    def test_early_expiration(self):
+        """Тест дорогая запись досрочно истекает незадолго до срока"""
+        self.cache.get('page')
+        with mock.patch('core.cache.time.time',
+                        return_value=time.time() + 10):
+            # Пересчёт занял 10 секунд - это запомнится как delta.
+            self.cache.set('page', 'value', 20)
+        with mock.patch('core.cache.random.random', return_value=0.99):
+            self.assertIsNone(self.worker().get('page'))
+        with mock.patch('core.cache.random.random', return_value=0.0):
+            self.assertEqual(self.worker().get('page'), 'value')
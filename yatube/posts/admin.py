@@ -1,9 +1,52 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.exceptions import ValidationError
+from django.db.models.functions import Substr
+from django.utils.text import Truncator
 
+from . import bulk, search
 from .models import Comment, Group, Post
+from .utilities import DryPaginator
 
+TEXT_PREVIEW_LENGTH = 80
 
-class PostAdmin(admin.ModelAdmin):
+
+class TextPreviewAdmin(admin.ModelAdmin):
+    """
+    Колонка text в списке заменяется началом текста: из базы читаются
+    только первые TEXT_PREVIEW_LENGTH символов. Число записей берётся
+    из оценки размера таблицы, без второго COUNT(*) ради "Показать все".
+    """
+    paginator = DryPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            text_start=Substr('text', 1, TEXT_PREVIEW_LENGTH + 1)
+        ).defer('text')
+
+    def get_list_display(self, request):
+        return tuple(
+            'text_preview' if name == 'text' else name
+            for name in super().get_list_display(request)
+        )
+
+    def text_preview(self, obj):
+        return Truncator(obj.text_start).chars(TEXT_PREVIEW_LENGTH)
+    text_preview.short_description = 'Текст'
+
+
+class PostActionForm(ActionForm):
+    group = forms.ModelChoiceField(
+        Group.objects.all(),
+        required=False,
+        label='Группа',
+        empty_label='без группы',
+    )
+
+
+class PostAdmin(TextPreviewAdmin):
     list_display = (
         'pk',
         'text',
@@ -12,14 +55,54 @@ class PostAdmin(admin.ModelAdmin):
         'group',
         'image',
     )
-    list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    raw_id_fields = ('author',)
+    autocomplete_fields = ('group',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
     list_editable = ('image',)
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
+    action_form = PostActionForm
+    actions = ('move_to_group', 'delete_posts')
+
+    def get_actions(self, request):
+        # Стандартное удаление загружает все посты и их комментарии.
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def get_search_results(self, request, queryset, search_term):
+        # Ищем по полнотекстовому индексу, а не LIKE по всей таблице.
+        if not search_term.strip():
+            return queryset, False
+        return search.filter_posts(queryset, search_term), False
+
+    def move_to_group(self, request, queryset):
+        # Поле action формы заполняется только внутри changelist_view.
+        field = self.action_form.base_fields['group']
+        try:
+            group = field.clean(request.POST.get('group'))
+        except ValidationError:
+            self.message_user(
+                request, 'Такой группы нет', level=messages.ERROR
+            )
+            return
+        moved = bulk.move_posts(queryset, group)
+        self.message_user(
+            request, f'Перенесено постов: {moved} в «{group or "без группы"}»'
+        )
+    move_to_group.short_description = 'Перенести в группу'
+    move_to_group.allowed_permissions = ('change',)
 
+    def delete_posts(self, request, queryset):
+        deleted = bulk.delete_posts(queryset)
+        self.message_user(request, f'Удалено постов: {deleted}')
+    delete_posts.short_description = 'Удалить выбранные посты'
+    delete_posts.allowed_permissions = ('delete',)
 
-class CommentAdmin(admin.ModelAdmin):
+
+class CommentAdmin(TextPreviewAdmin):
     list_display = (
         'pk',
         'text',
@@ -27,9 +110,24 @@ class CommentAdmin(admin.ModelAdmin):
         'author',
         'post',
     )
+    list_select_related = ('author', 'post')
+    raw_id_fields = ('post', 'author')
     search_fields = ('text',)
     list_filter = ('created',)
+    date_hierarchy = 'created'
     empty_value_display = '-пусто-'
+    actions = ('delete_comments',)
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def delete_comments(self, request, queryset):
+        deleted = bulk.delete_comments(queryset)
+        self.message_user(request, f'Удалено комментариев: {deleted}')
+    delete_comments.short_description = 'Удалить выбранные комментарии'
+    delete_comments.allowed_permissions = ('delete',)
 
 
 class GroupAdmin(admin.ModelAdmin):
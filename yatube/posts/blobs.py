@@ -0,0 +1,73 @@
+# posts/blobs.py
+"""
+Счётчики ссылок на файлы картинок (Blob).
+
+Сигналы Post меняют счётчик на единицу при смене и удалении картинки,
+массовые операции пересчитывают его по таблице постов (recount).
+Файл с нулём ссылок не удаляется сразу: новая загрузка того же
+содержимого может снова на него сослаться.
+"""
+from typing import Iterable, Optional
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Blob, Post
+from .storage import content_storage
+
+
+def _file_size(name: str) -> int:
+    try:
+        return content_storage.size(name)
+    except (OSError, SuspiciousFileOperation):
+        return 0
+
+
+def acquire(name: str) -> None:
+    """Ещё один пост ссылается на файл."""
+    if not name:
+        return
+    if not Blob.objects.filter(name=name).update(refs=F('refs') + 1):
+        Blob.objects.bulk_create(
+            [Blob(name=name, size=_file_size(name))],
+            ignore_conflicts=True,
+        )
+        Blob.objects.filter(name=name).update(refs=F('refs') + 1)
+
+
+def release(name: str) -> None:
+    """Пост больше не ссылается на файл."""
+    if name:
+        Blob.objects.filter(name=name, refs__gt=0).update(
+            refs=F('refs') - 1
+        )
+
+
+def recount(names: Optional[Iterable[str]] = None) -> None:
+    """
+    Точные счётчики по таблице постов: для файлов names или для всех.
+    Файлы постов без записи Blob получают её.
+    """
+    posts = Post.objects.exclude(image='').exclude(image__isnull=True)
+    blobs = Blob.objects.all()
+    if names is not None:
+        names = set(names)
+        posts = posts.filter(image__in=names)
+        blobs = blobs.filter(name__in=names)
+    known = set(blobs.values_list('name', flat=True))
+    Blob.objects.bulk_create(
+        [
+            Blob(name=name, size=_file_size(name))
+            for name in posts.order_by().values_list(
+                'image', flat=True
+            ).distinct().iterator()
+            if name not in known
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    references = Post.objects.filter(
+        image=OuterRef('name')
+    ).order_by().values('image').annotate(total=Count('pk')).values('total')
+    blobs.update(refs=Coalesce(Subquery(references), Value(0)))
@@ -0,0 +1,153 @@
+# posts/blurhash.py
+"""
+BlurHash (https://blurha.sh): картинка сжимается в строку из пары
+десятков символов - несколько членов косинусного разложения. Из неё
+на лету рисуется размытая заглушка, пока грузится сама картинка.
+"""
+import base64
+import io
+import math
+from functools import lru_cache
+from typing import List, Tuple
+
+from PIL import Image
+
+ALPHABET = (
+    '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+    '#$%*+,-.:;=?@[]^_{|}~'
+)
+# Для разложения хватает уменьшенной копии картинки.
+SAMPLE_SIZE = 32
+COMPONENTS = (4, 3)
+
+Color = Tuple[float, float, float]
+
+
+def _encode83(value: int, length: int) -> str:
+    return ''.join(
+        ALPHABET[value // 83 ** (length - i - 1) % 83]
+        for i in range(length)
+    )
+
+
+def _decode83(text: str) -> int:
+    value = 0
+    for char in text:
+        value = value * 83 + ALPHABET.index(char)
+    return value
+
+
+def _to_linear(value: int) -> float:
+    value = value / 255
+    if value <= 0.04045:
+        return value / 12.92
+    return ((value + 0.055) / 1.055) ** 2.4
+
+
+def _to_srgb(value: float) -> int:
+    value = max(0.0, min(1.0, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value: float, exponent: float) -> float:
+    return math.copysign(abs(value) ** exponent, value)
+
+
+def _basis(count: int, size: int) -> List[List[float]]:
+    return [
+        [math.cos(math.pi * component * x / size) for x in range(size)]
+        for component in range(count)
+    ]
+
+
+def encode(image: Image.Image, components: Tuple[int, int] = COMPONENTS
+           ) -> str:
+    """BlurHash картинки PIL."""
+    sample = image.convert('RGB')
+    sample.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE))
+    width, height = sample.size
+    pixels = [
+        tuple(_to_linear(channel) for channel in pixel)
+        for pixel in sample.getdata()
+    ]
+    count_x, count_y = components
+    basis_x, basis_y = _basis(count_x, width), _basis(count_y, height)
+    factors: List[Color] = []
+    for j in range(count_y):
+        for i in range(count_x):
+            scale = (1 if i == j == 0 else 2) / (width * height)
+            total = [0.0, 0.0, 0.0]
+            for y in range(height):
+                for x in range(width):
+                    weight = basis_x[i][x] * basis_y[j][y]
+                    pixel = pixels[y * width + x]
+                    for channel in range(3):
+                        total[channel] += weight * pixel[channel]
+            factors.append(tuple(value * scale for value in total))
+    dc, ac = factors[0], factors[1:]
+    result = _encode83(count_x - 1 + (count_y - 1) * 9, 1)
+    maximum = 1.0
+    if ac:
+        actual = max(abs(value) for color in ac for value in color)
+        quantised = max(0, min(82, int(actual * 166 - 0.5)))
+        maximum = (quantised + 1) / 166
+        result += _encode83(quantised, 1)
+    else:
+        result += _encode83(0, 1)
+    result += _encode83(
+        (_to_srgb(dc[0]) << 16) + (_to_srgb(dc[1]) << 8) + _to_srgb(dc[2]),
+        4,
+    )
+    for color in ac:
+        quantised = [
+            max(0, min(18, int(_sign_pow(value / maximum, 0.5) * 9 + 9.5)))
+            for value in color
+        ]
+        result += _encode83(
+            quantised[0] * 19 * 19 + quantised[1] * 19 + quantised[2], 2
+        )
+    return result
+
+
+def decode(blurhash: str, width: int, height: int) -> Image.Image:
+    """Картинка width x height по BlurHash."""
+    size = _decode83(blurhash[0])
+    count_x, count_y = size % 9 + 1, size // 9 + 1
+    maximum = (_decode83(blurhash[1]) + 1) / 166
+    dc = _decode83(blurhash[2:6])
+    colors: List[Color] = [
+        (_to_linear(dc >> 16), _to_linear(dc >> 8 & 255),
+         _to_linear(dc & 255))
+    ]
+    for index in range(1, count_x * count_y):
+        value = _decode83(blurhash[4 + index * 2:6 + index * 2])
+        colors.append(tuple(
+            _sign_pow((quantised - 9) / 9, 2) * maximum
+            for quantised in (value // 361, value // 19 % 19, value % 19)
+        ))
+    basis_x, basis_y = _basis(count_x, width), _basis(count_y, height)
+    pixels = []
+    for y in range(height):
+        for x in range(width):
+            total = [0.0, 0.0, 0.0]
+            for j in range(count_y):
+                for i in range(count_x):
+                    weight = basis_x[i][x] * basis_y[j][y]
+                    color = colors[i + j * count_x]
+                    for channel in range(3):
+                        total[channel] += weight * color[channel]
+            pixels.append(tuple(_to_srgb(value) for value in total))
+    image = Image.new('RGB', (width, height))
+    image.putdata(pixels)
+    return image
+
+
+@lru_cache(maxsize=1024)
+def data_url(blurhash: str, width: int = 32, height: int = 12) -> str:
+    """Заглушка в виде data: URL маленькой PNG; браузер её растянет."""
+    buffer = io.BytesIO()
+    decode(blurhash, width, height).save(buffer, 'PNG')
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/png;base64,{encoded}'
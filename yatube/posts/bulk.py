@@ -0,0 +1,128 @@
+# posts/bulk.py
+"""
+Массовые операции над постами и комментариями одним UPDATE/DELETE.
+
+Сигналы при этом не срабатывают, поэтому всё, что они обычно
+поддерживают (ленты, поисковый индекс, версии кэша), обновляется
+здесь же - по множеству затронутых строк, а не по одной. Счётчики
+пользователей пересчитывает задача в очереди, ссылки на файлы
+картинок - posts.blobs.
+
+Для массовой вставки (generate_dataset, import_posts) здесь же
+auto_now_add_disabled и общий пересчёт производных данных.
+"""
+from contextlib import contextmanager
+from typing import Iterable, Optional, Set
+
+from django.db import transaction
+from django.db.models import QuerySet
+
+from tasks.broker import enqueue
+
+from . import blobs, feed_cache, search, stats, timeline
+from .models import Comment, Group, Post, TimelineEntry
+
+
+def _distinct(queryset: QuerySet, field: str) -> Set[Optional[int]]:
+    return set(
+        queryset.order_by().values_list(field, flat=True).distinct()
+    )
+
+
+def _recount(user_ids: Iterable[int]) -> None:
+    enqueue(stats.recount_users, sorted(user_ids))
+
+
+@transaction.atomic
+def move_posts(queryset: QuerySet, group: Optional[Group]) -> int:
+    """Переносит посты в группу (None - убирает из группы)."""
+    posts = queryset.order_by()
+    authors = _distinct(posts, 'author_id')
+    groups = _distinct(posts, 'group_id') | {group.pk if group else None}
+    moved = posts.update(group=group)
+    feed_cache.bump(
+        'global',
+        *(f'author:{author_id}' for author_id in authors),
+        *(f'group:{group_id}' for group_id in groups),
+    )
+    return moved
+
+
+@transaction.atomic
+def delete_posts(queryset: QuerySet) -> int:
+    """Удаляет посты вместе с их комментариями и записями лент."""
+    posts = queryset.order_by().values('pk')
+    authors = _distinct(queryset, 'author_id')
+    groups = _distinct(queryset, 'group_id')
+    images = _distinct(queryset.exclude(image=''), 'image') - {None}
+    comments = Comment.objects.filter(post__in=posts)
+    commenters = _distinct(comments, 'author_id')
+    search.unindex_posts(posts)
+    comments._raw_delete(comments.db)
+    entries = TimelineEntry.objects.filter(post__in=posts)
+    entries._raw_delete(entries.db)
+    deleted = Post.objects.filter(pk__in=posts)
+    deleted = deleted._raw_delete(deleted.db)
+    blobs.recount(images)
+    _recount(authors | commenters)
+    feed_cache.bump(
+        'global',
+        *(f'author:{author_id}' for author_id in authors),
+        *(f'group:{group_id}' for group_id in groups),
+        *(f'profile:{user_id}' for user_id in commenters),
+    )
+    return deleted
+
+
+@transaction.atomic
+def delete_comments(queryset: QuerySet) -> int:
+    comments = queryset.order_by()
+    posts = _distinct(comments, 'post_id')
+    commenters = _distinct(comments, 'author_id')
+    deleted = Comment.objects.filter(pk__in=comments.values('pk'))
+    deleted = deleted._raw_delete(deleted.db)
+    _recount(commenters)
+    feed_cache.bump(
+        *(f'post:{post_id}' for post_id in posts),
+        *(f'profile:{user_id}' for user_id in commenters),
+    )
+    return deleted
+
+
+@contextmanager
+def auto_now_add_disabled(model, field_name: str):
+    """Позволяет bulk_create сохранить собственные даты."""
+    field = model._meta.get_field(field_name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def rebuild_derived(after: Optional[int] = None,
+                    batch_size: int = 1000) -> None:
+    """
+    Пересчитывает после bulk_create всё, что обычно поддерживают
+    сигналы: счётчики, ссылки на файлы, ленты и поисковый индекс.
+    С after ленты и индекс дополняются только постами с pk больше after.
+    """
+    stats.reconcile()
+    blobs.recount()
+    timeline.rebuild_all(after)
+    search.rebuild(batch_size, after)
+    # Версии фрагментов лент не знают о массовой вставке.
+    posts = Post.objects.all()
+    if after is not None:
+        posts = posts.filter(pk__gt=after)
+    authors = _distinct(posts, 'author_id')
+    commenters = _distinct(
+        Comment.objects.filter(post__in=posts.values('pk')), 'author_id'
+    )
+    feed_cache.bump(
+        'global',
+        'groups',
+        *(f'author:{author_id}' for author_id in authors),
+        *(f'group:{group_id}' for group_id in _distinct(posts, 'group_id')),
+        *(f'profile:{user_id}' for user_id in authors | commenters),
+    )
@@ -0,0 +1,65 @@
+# posts/counting.py
+"""
+Число строк без COUNT(*) по огромным таблицам.
+
+Для кварисета без условий берётся оценка размера таблицы:
+pg_class.reltuples на PostgreSQL или счётчик TableCount, который на
+SQLite поддерживают триггеры. Для кварисета с условиями PostgreSQL
+даёт оценку планировщика. Оценка используется, только когда она не
+меньше COUNT_ESTIMATE_THRESHOLD - небольшие выборки считаются точно.
+
+Триггеры создают миграции (posts/migrations/_count_triggers.py). Любая
+миграция, пересоздающая posts_post или posts_comment на SQLite, должна
+создать их заново - иначе счётчик TableCount перестанет меняться.
+"""
+import json
+from typing import Optional
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import QuerySet
+
+from .models import TableCount
+
+
+def table_estimate(model) -> Optional[int]:
+    """Оценка числа строк таблицы модели или None, если её нет."""
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [connection.ops.quote_name(table)],
+            )
+            row = cursor.fetchone()
+        # -1: таблицу ещё ни разу не анализировали.
+        return int(row[0]) if row and row[0] >= 0 else None
+    return TableCount.objects.filter(name=table).values_list(
+        'rows', flat=True
+    ).first()
+
+
+def planner_estimate(queryset: QuerySet) -> Optional[int]:
+    """Оценка планировщика PostgreSQL для кварисета с условиями."""
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count(queryset: QuerySet, exact: bool = False) -> int:
+    """Число строк кварисета: точное или оценка для больших таблиц."""
+    if not exact:
+        if queryset.query.where:
+            estimate = planner_estimate(queryset)
+        else:
+            estimate = table_estimate(queryset.model)
+        if (estimate is not None
+                and estimate >= settings.COUNT_ESTIMATE_THRESHOLD):
+            return estimate
+    return queryset.count()
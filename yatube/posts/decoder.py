@@ -0,0 +1,104 @@
+# posts/decoder.py
+"""
+Полное декодирование загруженной картинки в отдельном процессе.
+
+Процесс сам ограничивает себе память (RLIMIT_AS) и процессорное время
+(RLIMIT_CPU), поэтому картинка-бомба убивает его, а не процесс
+сервера. Модуль не зависит от Django: его запускает posts.images как
+python -m posts.decoder PATH MAX_PIXELS MAX_FRAMES MEMORY CPU
+(PATH "-" - читать файл из stdin). Ответ - JSON в stdout: сведения о
+картинке или {"error": ...} с ненулевым кодом выхода.
+"""
+import io
+import json
+import sys
+import warnings
+
+from PIL import Image
+
+from posts import blurhash
+
+try:
+    import resource
+except ImportError:  # Windows: ограничений процесса нет.
+    resource = None
+
+
+class Rejected(Exception):
+    """Картинка не проходит ограничения; текст - для пользователя."""
+
+
+def check_pixels(width: int, height: int, max_pixels: int) -> None:
+    if width * height > max_pixels:
+        raise Rejected(
+            f'Картинка слишком большая: {width}x{height}, допустимо не '
+            f'больше {max_pixels // 1000000} мегапикселей.'
+        )
+
+
+def check_frames(frames: int, max_frames: int) -> None:
+    if frames > max_frames:
+        raise Rejected(
+            f'Слишком много кадров анимации: {frames}, допустимо не '
+            f'больше {max_frames}.'
+        )
+
+
+def limit_process(memory: int, cpu: int) -> None:
+    if resource is None:
+        return
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+
+
+def decode(file, max_pixels: int, max_frames: int) -> dict:
+    """Проверяет заголовок, декодирует все кадры, считает BlurHash."""
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', Image.DecompressionBombWarning)
+        try:
+            image = Image.open(file)
+        except (Image.DecompressionBombError,
+                Image.DecompressionBombWarning):
+            raise Rejected('Картинка слишком большая.')
+    with image:
+        check_pixels(image.width, image.height, max_pixels)
+        frames = getattr(image, 'n_frames', 1)
+        check_frames(frames, max_frames)
+        for frame in range(frames):
+            image.seek(frame)
+            image.load()
+        image.seek(0)
+        return {
+            'format': image.format,
+            'frames': frames,
+            'image_blurhash': blurhash.encode(image),
+        }
+
+
+def main(argv) -> int:
+    path, max_pixels, max_frames, memory, cpu = argv
+    limit_process(int(memory), int(cpu))
+    try:
+        if path == '-':
+            file = io.BytesIO(sys.stdin.buffer.read())
+        else:
+            file = open(path, 'rb')
+        with file:
+            result = decode(file, int(max_pixels), int(max_frames))
+    except Rejected as error:
+        result, code = {'error': str(error)}, 1
+    except MemoryError:
+        result, code = {
+            'error': 'Картинке нужно слишком много памяти.'
+        }, 1
+    except Exception:
+        result, code = {'error': 'Не удалось прочитать картинку.'}, 1
+    else:
+        code = 0
+    json.dump(result, sys.stdout, ensure_ascii=False)
+    return code
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
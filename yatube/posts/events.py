@@ -0,0 +1,103 @@
+# posts/events.py
+"""
+Живые обновления лент через Server-Sent Events.
+
+Новый пост после фиксации транзакции публикуется в брокер, а открытые
+потоки /events/ сообщают клиентам, сколько постов появилось в их ленте.
+Страница показывает плашку "Новых постов: N" вместо того, чтобы её
+перезагружали в ожидании новостей.
+
+LocalBroker раздаёт события только внутри процесса. Для нескольких
+процессов сервера EVENTS_BROKER указывает на класс с теми же методами
+subscribe/unsubscribe/publish поверх внешнего брокера.
+"""
+import json
+import queue
+import threading
+import time
+from typing import Iterator, Optional, Set
+
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+from django.utils.module_loading import import_string
+
+POSTS_CHANNEL = 'posts'
+# Через сколько миллисекунд браузер переподключается после обрыва.
+RETRY_MS = 10000
+# Сколько событий ждут медленного клиента; лишние отбрасываются.
+SUBSCRIBER_BUFFER = 100
+
+
+class LocalBroker:
+    """Публикация и подписка внутри одного процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, channel: str) -> queue.Queue:
+        subscription = queue.Queue(SUBSCRIBER_BUFFER)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, channel: str, subscription: queue.Queue) -> None:
+        with self._lock:
+            self._subscribers.get(channel, set()).discard(subscription)
+
+    def publish(self, channel: str, event: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(event)
+            except queue.Full:
+                pass
+
+
+broker = SimpleLazyObject(lambda: import_string(settings.EVENTS_BROKER)())
+
+
+def publish_post(post) -> None:
+    broker.publish(POSTS_CHANNEL, {
+        'id': post.pk,
+        'author': post.author_id,
+        'group': post.group_id,
+    })
+
+
+def message(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    lines = [f'event: {event}', f'data: {json.dumps(data)}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def stream(authors: Optional[Set[int]] = None,
+           missed: int = 0, last_id: Optional[int] = None) -> Iterator[str]:
+    """
+    Поток событий "posts" с числом новых постов. authors ограничивает
+    ленту подписками; missed - посты, пропущенные до переподключения.
+    Поток закрывается через EVENTS_STREAM_TIMEOUT, чтобы не держать
+    поток сервера бесконечно: браузер сам откроет его снова.
+    """
+    yield f'retry: {RETRY_MS}\n\n'
+    if missed:
+        yield message('posts', {'count': missed}, last_id)
+    # Подписка только при чтении ответа: незачитанный ответ не оставит
+    # после себя подписчика.
+    subscription = broker.subscribe(POSTS_CHANNEL)
+    deadline = time.monotonic() + settings.EVENTS_STREAM_TIMEOUT
+    try:
+        while time.monotonic() < deadline:
+            try:
+                event = subscription.get(timeout=settings.EVENTS_HEARTBEAT)
+            except queue.Empty:
+                # Комментарий SSE не даёт прокси закрыть тихое соединение.
+                yield ': ping\n\n'
+                continue
+            if authors is not None and event['author'] not in authors:
+                continue
+            yield message('posts', {'count': 1}, event['id'])
+    finally:
+        broker.unsubscribe(POSTS_CHANNEL, subscription)
@@ -0,0 +1,88 @@
+# posts/export.py
+"""
+Потоковая выгрузка таблиц в JSONL или CSV.
+
+Строки читаются курсором порциями (QuerySet.iterator) сразу в виде
+кортежей, без создания моделей, и отдаются кусками текста: память не
+растёт с размером таблицы. Параметр after выгружает только строки с
+pk больше заданного - так периодическая выгрузка забирает лишь новое.
+"""
+import csv
+import io
+import itertools
+from typing import Iterable, Iterator, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.text import compress_sequence
+
+from .models import Comment, Follow, Group, Post
+
+TABLES = {
+    'posts': (
+        Post, ('id', 'text', 'pub_date', 'author_id', 'group_id', 'image')
+    ),
+    'comments': (
+        Comment, ('id', 'post_id', 'author_id', 'text', 'created')
+    ),
+    'follows': (Follow, ('id', 'user_id', 'author_id')),
+    'groups': (Group, ('id', 'title', 'slug', 'description')),
+}
+FORMATS = {
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'csv': ('text/csv', 'csv'),
+}
+CHUNK_SIZE = 2000
+
+
+def rows(table: str, after: Optional[int] = None,
+         chunk_size: int = CHUNK_SIZE) -> Iterator[tuple]:
+    model, columns = TABLES[table]
+    queryset = model.objects.order_by('pk')
+    if after is not None:
+        queryset = queryset.filter(pk__gt=after)
+    return queryset.values_list(*columns).iterator(chunk_size=chunk_size)
+
+
+def _jsonl(columns, records) -> Iterator[str]:
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for record in records:
+        yield encoder.encode(dict(zip(columns, record))) + '\n'
+
+
+def _csv(columns, records) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for record in itertools.chain([columns], records):
+        writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _batched(lines: Iterable[str], size: int) -> Iterator[bytes]:
+    # Отдаём порциями: построчная запись в сокет слишком дорога.
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == size:
+            yield ''.join(batch).encode()
+            batch = []
+    if batch:
+        yield ''.join(batch).encode()
+
+
+def stream(table: str, fmt: str = 'jsonl', after: Optional[int] = None,
+           gzip: bool = False,
+           chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Выгрузка таблицы кусками байтов, при gzip - сжатых."""
+    _, columns = TABLES[table]
+    serialize = _jsonl if fmt == 'jsonl' else _csv
+    chunks = _batched(
+        serialize(columns, rows(table, after, chunk_size)), chunk_size
+    )
+    return compress_sequence(chunks) if gzip else chunks
+
+
+def filename(table: str, fmt: str, gzip: bool = False) -> str:
+    name = f'{table}.{FORMATS[fmt][1]}'
+    return f'{name}.gz' if gzip else name
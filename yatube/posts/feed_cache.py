@@ -0,0 +1,94 @@
+# posts/feed_cache.py
+"""
+Версии областей кэша лент.
+
+Ключ фрагмента складывается из параметров страницы и версий областей
+(global, group:<id>, author:<id>, post:<id>, groups, profile:<id>).
+Изменение данных увеличивает версию области, и старые фрагменты просто
+перестают запрашиваться, поэтому их можно хранить часами. Из тех же
+версий собирается ETag страниц для условных GET-запросов.
+
+Без SHARED_CACHE версии живут в памяти процесса, и сброс в другом
+воркере сервера или в run_worker до него не доходит. Тогда в ETag
+входит ещё номер интервала FEED_CACHE_TIMEOUT: устаревший ответ
+отдаётся как 304 не дольше, чем живёт фрагмент.
+"""
+import hashlib
+import time
+from typing import Dict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIRequest
+
+from .models import Post
+
+VERSION_KEY = 'feed-version:{}'
+
+
+def _initial_version() -> int:
+    # Версия после вытеснения ключа не совпадёт ни с одной из прежних.
+    return time.time_ns()
+
+
+def versions(*scopes: str) -> str:
+    """Текущие версии областей одной строкой."""
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _initial_version(), None)
+            found[key] = cache.get(key)
+    return '.'.join(str(found[key]) for key in keys)
+
+
+def bump(*scopes: str) -> None:
+    """Сбрасывает закэшированные фрагменты указанных областей."""
+    for scope in set(scopes):
+        key = VERSION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+
+
+def bump_image(name: str) -> None:
+    """
+    Сбрасывает фрагменты со всеми постами картинки: готовая миниатюра
+    или варианты должны сменить в них заглушку.
+    """
+    scopes = {'global'}
+    for pk, author_id, group_id in Post.objects.filter(
+        image=name
+    ).values_list('pk', 'author_id', 'group_id').iterator():
+        scopes.update(
+            (f'post:{pk}', f'author:{author_id}', f'group:{group_id}')
+        )
+    bump(*scopes)
+
+
+def fragment(request: WSGIRequest, *scopes: str) -> Dict[str, object]:
+    """
+    Параметры для {% cache feed_cache.timeout 'name' feed_cache.key %}:
+    ключ учитывает страницу (курсор или номер) и версии областей.
+    """
+    return {
+        'key': f'{request.GET.urlencode()}|{versions(*scopes)}',
+        'timeout': settings.FEED_CACHE_TIMEOUT,
+    }
+
+
+def etag(request: WSGIRequest, *scopes: str) -> str:
+    """
+    ETag страницы: версии областей, параметры страницы и зритель (от
+    него зависят шапка, кнопки подписки и правки). Запросов к базе нет.
+    """
+    user = request.user
+    viewer = user.pk if user.is_authenticated else 'anonymous'
+    raw = (
+        f'{request.path}|{request.GET.urlencode()}|{viewer}|'
+        f'{versions(*scopes)}'
+    )
+    if not settings.SHARED_CACHE:
+        raw += f'|{int(time.time() // settings.FEED_CACHE_TIMEOUT)}'
+    return hashlib.md5(raw.encode()).hexdigest()
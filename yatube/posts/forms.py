@@ -1,5 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from .decoder import Rejected
+from .images import decode, fill_metadata
 from .models import Comment, Post
 
 
@@ -9,6 +12,39 @@ class PostForm(forms.ModelForm):
         fields = ('text', 'group', 'image')
         labels = {'text': 'Введите текст:', 'group': 'Выберите группу:'}
 
+    def __init__(self, *args, rejected_uploads=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Файлы, которые обработчики загрузки (posts.uploads) отклонили
+        # ещё при приёме: {поле: причина}.
+        self.rejected_uploads = rejected_uploads or {}
+        self.image_metadata = None
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            try:
+                self.image_metadata = decode(image)
+            except Rejected as error:
+                raise forms.ValidationError(str(error))
+        return image
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field, message in self.rejected_uploads.items():
+            if field in self.fields:
+                self.add_error(field, message)
+        return cleaned_data
+
+    def save(self, commit=True):
+        # Заглушка считается по загруженному файлу один раз, а не при
+        # каждом показе картинки.
+        if 'image' in self.changed_data:
+            fill_metadata(
+                self.instance, self.cleaned_data['image'],
+                self.image_metadata,
+            )
+        return super().save(commit)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,115 @@
+# posts/images.py
+"""
+Сведения о картинке поста, которые считаются один раз при загрузке:
+BlurHash для заглушки, пока миниатюра не готова. Рамку картинки
+задают размеры миниатюры, а не исходника.
+
+Загруженный пользователем файл целиком декодируется только в
+отдельном процессе (decode): так картинка-бомба не раздувает память
+процесса сервера.
+"""
+import json
+import subprocess
+import sys
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from PIL import Image, UnidentifiedImageError
+
+from . import blurhash
+from .decoder import Rejected
+from .models import Post
+from .storage import content_storage
+
+METADATA_FIELDS = ('image_blurhash',)
+
+
+def metadata(file) -> Optional[dict]:
+    """Сведения о файле картинки; None, если его не прочитать."""
+    try:
+        file.seek(0)
+        with Image.open(file) as image:
+            # JPEG сразу декодируется в уменьшенном виде: для BlurHash
+            # полный размер не нужен.
+            image.draft('RGB', (blurhash.SAMPLE_SIZE, blurhash.SAMPLE_SIZE))
+            result = {'image_blurhash': blurhash.encode(image)}
+    except (OSError, UnidentifiedImageError):
+        return None
+    finally:
+        file.seek(0)
+    return result
+
+
+def decode(file) -> dict:
+    """
+    Декодирует загруженный файл в процессе posts.decoder с пределами
+    памяти и времени и возвращает сведения о картинке. Rejected -
+    если картинка не проходит ограничения или процесс не справился.
+    """
+    if hasattr(file, 'temporary_file_path'):
+        path, data = file.temporary_file_path(), None
+    else:
+        file.seek(0)
+        path, data = '-', file.read()
+        file.seek(0)
+    command = [
+        sys.executable, '-m', 'posts.decoder', path,
+        str(settings.POST_IMAGE_MAX_PIXELS),
+        str(settings.POST_IMAGE_MAX_FRAMES),
+        str(settings.POST_IMAGE_DECODE_MEMORY),
+        str(settings.POST_IMAGE_DECODE_CPU),
+    ]
+    try:
+        completed = subprocess.run(
+            command, input=data, capture_output=True,
+            cwd=settings.BASE_DIR,
+            # Процессорное время ограничено в самом процессе, а это -
+            # на случай, если он ждёт чего-то кроме процессора.
+            timeout=settings.POST_IMAGE_DECODE_CPU * 3,
+        )
+    except subprocess.TimeoutExpired:
+        raise Rejected('Картинка обрабатывается слишком долго.')
+    try:
+        result = json.loads(completed.stdout)
+    except ValueError:
+        # Процесс убит при превышении предела памяти или времени.
+        raise Rejected('Не удалось обработать картинку.')
+    if completed.returncode or 'error' in result:
+        raise Rejected(result.get('error', 'Не удалось прочитать картинку.'))
+    return {'image_blurhash': result['image_blurhash']}
+
+
+def fill_metadata(post, file, values: Optional[dict] = None) -> None:
+    """
+    Заполняет поля картинки поста готовыми values или по файлу;
+    без картинки - очищает их.
+    """
+    if file and values is None:
+        values = metadata(file)
+    elif not file:
+        values = None
+    for field in METADATA_FIELDS:
+        setattr(post, field, values[field] if values else None)
+    # Варианты старой картинки новой не подходят; новые нарежет задача.
+    post.image_variants = None
+
+
+def fill_stored(names: Iterable[str]) -> int:
+    """
+    Заполняет сведения у постов с уже сохранёнными картинками: каждый
+    файл читается один раз, посты обновляются одним UPDATE на файл.
+    Возвращает число файлов, которые не удалось прочитать.
+    """
+    missing = 0
+    for name in names:
+        try:
+            with content_storage.open(name) as file:
+                values = metadata(file)
+        except (OSError, SuspiciousFileOperation):
+            values = None
+        if values is None:
+            missing += 1
+            continue
+        Post.objects.filter(image=name).update(**values)
+    return missing
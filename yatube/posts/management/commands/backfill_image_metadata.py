@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts import images
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет BlurHash картинок у постов, загруженных до '
+        'появления этого поля.'
+    )
+
+    def handle(self, *args, **options):
+        names = list(
+            Post.objects.exclude(image='')
+            .filter(image_blurhash__isnull=True)
+            .order_by().values_list('image', flat=True).distinct()
+        )
+        missing = images.fill_stored(names)
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинок обработано: {len(names) - missing}, '
+            f'не прочитано: {missing}'
+        ))
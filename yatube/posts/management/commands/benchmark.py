@@ -0,0 +1,209 @@
+import json
+import logging
+import math
+import os
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import urls as posts_urls
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+
+BENCHMARKS_DIR = os.path.join(settings.BASE_DIR, 'benchmarks')
+PERCENTILES = (50, 95, 99)
+# Потоковые ответы: их время зависит от клиента и объёма данных.
+STREAMING = {'post_events', 'export'}
+# GET подписки меняет данные, а правка чужого поста и комментарий
+# на GET только перенаправляют - замерять там нечего.
+MUTATING = {'profile_follow', 'profile_unfollow'}
+REDIRECT_ONLY = {'post_edit', 'add_comment'}
+SKIPPED = STREAMING | MUTATING | REDIRECT_ONLY
+
+
+def percentile(values: list, rank: int) -> float:
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(rank / 100 * len(ordered)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержки (p50/p95/p99) и число SQL-запросов для всех '
+        'адресов posts/urls.py, сохраняет результат в JSON и сравнивает '
+        'его с базовой линией.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument(
+            '--warmup', type=int, default=2,
+            help='Прогревочные запросы, которые не попадают в замеры.',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом.',
+        )
+        parser.add_argument(
+            '--output',
+            default=os.path.join(BENCHMARKS_DIR, 'latest.json'),
+        )
+        parser.add_argument(
+            '--baseline',
+            default=os.path.join(BENCHMARKS_DIR, 'baseline.json'),
+        )
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Записать результат как новую базовую линию.',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Допустимый рост p95 относительно базовой линии.',
+        )
+        parser.add_argument(
+            '--fail-on-regression', action='store_true',
+            help='Завершиться с ошибкой, если есть регрессии.',
+        )
+
+    def handle(self, *args, **options):
+        if not Post.objects.exists():
+            raise CommandError(
+                'Нет данных: сначала запустите generate_dataset.'
+            )
+        client = Client()
+        client.force_login(self.reader())
+        results = {}
+        # Строка лога на каждый запрос бенчмарку не нужна.
+        perf_logger = logging.getLogger('yatube.perf')
+        perf_logger.disabled = True
+        try:
+            for name, url, params in self.targets():
+                results[name] = self.measure(client, url, params, options)
+                self.stdout.write(
+                    f'{name:<20} p50 {results[name]["p50_ms"]:>8} мс  '
+                    f'p95 {results[name]["p95_ms"]:>8} мс  '
+                    f'SQL {results[name]["queries"]}'
+                )
+        finally:
+            perf_logger.disabled = False
+        report = {
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'runs': options['runs'],
+            'cold': options['cold'],
+            'dataset': {
+                model.__name__: model.objects.count()
+                for model in (User, Group, Post, Comment, Follow)
+            },
+            'results': results,
+        }
+        self.write(options['output'], report)
+        if options['save_baseline']:
+            self.write(options['baseline'], report)
+            return
+        regressions = self.compare(
+            report, options['baseline'], options['tolerance']
+        )
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f'Регрессий: {len(regressions)}')
+
+    @staticmethod
+    def reader() -> User:
+        """Пользователь с самым большим числом подписок."""
+        stats = UserStats.objects.order_by('-following_count').first()
+        return stats.user if stats else User.objects.first()
+
+    @staticmethod
+    def url_kwargs() -> dict:
+        """Самые нагруженные объекты для параметров адресов."""
+        author = UserStats.objects.order_by(
+            '-followers_count'
+        ).select_related('user').first()
+        group = Group.objects.annotate(
+            total=Count('posts')
+        ).order_by('-total').first()
+        post = Post.objects.annotate(
+            total=Count('comments')
+        ).order_by('-total').first()
+        return {
+            'username': author.user.username if author else '',
+            'slug': group.slug if group else '',
+            'post_id': post.pk,
+        }
+
+    def targets(self):
+        kwargs = self.url_kwargs()
+        text = Post.objects.values_list('text', flat=True).first()
+        extra_params = {'search': {'q': text.split()[0]}}
+        for pattern in posts_urls.urlpatterns:
+            if pattern.name in SKIPPED:
+                continue
+            converters = pattern.pattern.converters
+            url = reverse(
+                f'{posts_urls.app_name}:{pattern.name}',
+                kwargs={key: kwargs[key] for key in converters},
+            )
+            yield pattern.name, url, extra_params.get(pattern.name, {})
+
+    @staticmethod
+    def measure(client: Client, url: str, params: dict, options) -> dict:
+        for _ in range(options['warmup']):
+            client.get(url, params)
+        timings = []
+        for _ in range(options['runs']):
+            if options['cold']:
+                cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.get(url, params)
+                timings.append((time.perf_counter() - started) * 1000)
+        result = {
+            'url': url,
+            'status': response.status_code,
+            'queries': len(queries),
+            'mean_ms': round(sum(timings) / len(timings), 2),
+        }
+        for rank in PERCENTILES:
+            result[f'p{rank}_ms'] = round(percentile(timings, rank), 2)
+        return result
+
+    @staticmethod
+    def write(path: str, report: dict) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+    def compare(self, report: dict, path: str, tolerance: float) -> list:
+        if not os.path.exists(path):
+            self.stdout.write(
+                'Базовой линии нет: запустите с --save-baseline.'
+            )
+            return []
+        with open(path, encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+        regressions = []
+        for name, current in report['results'].items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            slower = current['p95_ms'] > previous['p95_ms'] * (1 + tolerance)
+            more_queries = current['queries'] > previous['queries']
+            if slower or more_queries:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(
+                    f'{name}: p95 {previous["p95_ms"]} -> '
+                    f'{current["p95_ms"]} мс, SQL {previous["queries"]} '
+                    f'-> {current["queries"]}'
+                ))
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(
+                'Регрессий относительно базовой линии нет.'
+            ))
+        return regressions
@@ -0,0 +1,43 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает посты, комментарии, подписки или группы '
+        'в JSONL или CSV, при необходимости сжимая gzip.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=sorted(export.TABLES))
+        parser.add_argument(
+            '--format', choices=sorted(export.FORMATS), default='jsonl',
+        )
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument(
+            '--after', type=int,
+            help='Выгрузить только строки с pk больше заданного.',
+        )
+        parser.add_argument(
+            '--output', help='Файл для выгрузки; по умолчанию stdout.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=export.CHUNK_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        chunks = export.stream(
+            options['table'], options['format'], options['after'],
+            options['gzip'], options['chunk_size'],
+        )
+        if options['output']:
+            with open(options['output'], 'wb') as file:
+                file.writelines(chunks)
+            return
+        # Пишем байты мимо self.stdout: он перекодирует и добавляет \n.
+        output = getattr(self.stdout, 'buffer', None) or sys.stdout.buffer
+        output.writelines(chunks)
+        output.flush()
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from posts import media_gc
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из MEDIA_ROOT картинки, варианты и миниатюры, на '
+        'которые больше не ссылается ни один пост.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать файлы, ничего не удалять.',
+        )
+        parser.add_argument(
+            '--quarantine',
+            help='Переносить файлы в этот каталог вместо удаления.',
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=media_gc.MIN_AGE,
+            help='Не трогать файлы моложе стольких секунд.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=media_gc.BATCH_SIZE,
+            help='Сколько файлов обрабатывать за раз.',
+        )
+        parser.add_argument(
+            '--verbose', action='store_true',
+            help='Печатать каждый файл.',
+        )
+
+    def handle(self, *args, **options):
+        files, size = media_gc.collect(
+            dry_run=options['dry_run'],
+            quarantine=options['quarantine'],
+            min_age=options['min_age'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write if options['verbose'] else None,
+        )
+        verb = 'Будет освобождено' if options['dry_run'] else 'Освобождено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb}: {filesizeformat(size)}, файлов: {files}'
+        ))
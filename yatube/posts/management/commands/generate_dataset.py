@@ -0,0 +1,236 @@
+import datetime
+import io
+import random
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from posts import bulk, images as post_images, thumbnails, variants
+from posts.models import Comment, Follow, Group, Post, User
+from posts.storage import content_storage
+
+PREFIX = 'bench'
+TEXT_POOL_SIZE = 1000
+
+
+def power_law_weights(count: int, exponent: float) -> list:
+    """Накопленные веса Ципфа: первый элемент самый популярный."""
+    return list(accumulate(1 / rank ** exponent
+                           for rank in range(1, count + 1)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует большой синтетический набор данных для бенчмарков: '
+        'пользователи, группы, степенной граф подписок, посты с '
+        'картинками и комментарии.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--comments', type=int, default=1000000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя.',
+        )
+        parser.add_argument(
+            '--images', type=int, default=20,
+            help='Сколько разных картинок сгенерировать для постов.',
+        )
+        parser.add_argument(
+            '--image-share', type=float, default=0.3,
+            help='Доля постов с картинкой.',
+        )
+        parser.add_argument(
+            '--exponent', type=float, default=1.1,
+            help='Показатель степенного распределения подписчиков.',
+        )
+        parser.add_argument(
+            '--post-exponent', type=float, default=0.8,
+            help='Показатель степенного распределения активности авторов.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.faker = Faker('ru_RU')
+        self.faker.seed_instance(options['seed'])
+        self.batch_size = options['batch_size']
+        self.texts = [
+            self.faker.paragraph(nb_sentences=self.random.randint(1, 6))
+            for _ in range(TEXT_POOL_SIZE)
+        ]
+        users = self.create_users(options['users'])
+        groups = self.create_groups(options['groups'])
+        images = self.create_images(options['images'])
+        self.create_follows(
+            users,
+            power_law_weights(len(users), options['exponent']),
+            options['follows'],
+        )
+        # Активность авторов тоже степенная, но не связана с числом
+        # подписчиков: иначе у самого популярного автора окажется и
+        # большая доля всех постов, а ленты раздуются на порядки.
+        posts = self.create_posts(
+            self.random.sample(users, len(users)),
+            power_law_weights(len(users), options['post_exponent']),
+            groups, images, options['posts'], options['image_share'],
+        )
+        self.create_comments(users, posts, options['comments'])
+        self.rebuild_derived_data(images)
+        self.stdout.write(self.style.SUCCESS('Набор данных готов.'))
+
+    def log(self, message):
+        self.stdout.write(message)
+
+    def in_batches(self, model, objects, **kwargs):
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) == self.batch_size:
+                model.objects.bulk_create(batch, **kwargs)
+                batch = []
+        model.objects.bulk_create(batch, **kwargs)
+
+    def random_dates(self, count: int):
+        now = timezone.now()
+        seconds = 365 * 24 * 60 * 60
+        for _ in range(count):
+            yield now - datetime.timedelta(
+                seconds=self.random.randrange(seconds)
+            )
+
+    def create_users(self, count: int) -> list:
+        self.log(f'Пользователи: {count}')
+        start = User.objects.filter(username__startswith=PREFIX).count()
+        password = make_password(None)
+        self.in_batches(User, (
+            User(
+                username=f'{PREFIX}{start + i}',
+                first_name=self.faker.first_name(),
+                last_name=self.faker.last_name(),
+                password=password,
+            )
+            for i in range(count)
+        ))
+        return list(
+            User.objects.filter(username__startswith=PREFIX)
+            .order_by('pk').values_list('pk', flat=True)[start:]
+        )
+
+    def create_groups(self, count: int) -> list:
+        self.log(f'Группы: {count}')
+        start = Group.objects.filter(slug__startswith=PREFIX).count()
+        self.in_batches(Group, (
+            Group(
+                title=self.faker.catch_phrase()[:200],
+                slug=f'{PREFIX}-{start + i}',
+                description=self.faker.paragraph(),
+            )
+            for i in range(count)
+        ))
+        return list(
+            Group.objects.filter(slug__startswith=PREFIX)
+            .values_list('pk', flat=True)
+        )
+
+    def create_images(self, count: int) -> list:
+        self.log(f'Картинки: {count}')
+        names = []
+        for i in range(count):
+            image = Image.new('RGB', (1280, 720), self.faker.hex_color())
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=80)
+            names.append(content_storage.save(
+                f'posts/{PREFIX}_{i}.jpg', ContentFile(buffer.getvalue())
+            ))
+        return names
+
+    def create_follows(self, users: list, weights: list, average: int):
+        self.log(f'Подписки: ~{average * len(users)}')
+
+        def follows():
+            for user_id in users:
+                count = min(
+                    int(self.random.paretovariate(2) * average / 2),
+                    len(users) - 1,
+                )
+                authors = set(self.random.choices(
+                    users, cum_weights=weights, k=count
+                ))
+                authors.discard(user_id)
+                for author_id in authors:
+                    yield Follow(user_id=user_id, author_id=author_id)
+
+        self.in_batches(Follow, follows(), ignore_conflicts=True)
+
+    def create_posts(self, users, weights, groups, images, count, share):
+        self.log(f'Посты: {count}')
+        last_pk = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        authors = iter(self.random.choices(users, cum_weights=weights,
+                                           k=count))
+
+        def posts():
+            for pub_date in self.random_dates(count):
+                yield Post(
+                    text=self.random.choice(self.texts),
+                    author_id=next(authors),
+                    group_id=(
+                        self.random.choice(groups)
+                        if groups and self.random.random() < 0.5 else None
+                    ),
+                    image=(
+                        self.random.choice(images)
+                        if images and self.random.random() < share else ''
+                    ),
+                    pub_date=pub_date,
+                )
+
+        with bulk.auto_now_add_disabled(Post, 'pub_date'):
+            with transaction.atomic():
+                self.in_batches(Post, posts())
+        return list(
+            Post.objects.filter(pk__gt=last_pk).values_list('pk', flat=True)
+        )
+
+    def create_comments(self, users: list, posts: list, count: int):
+        self.log(f'Комментарии: {count}')
+        if not posts:
+            return
+        comments = (
+            Comment(
+                post_id=self.random.choice(posts),
+                author_id=self.random.choice(users),
+                text=self.random.choice(self.texts),
+                created=created,
+            )
+            for created in self.random_dates(count)
+        )
+        with bulk.auto_now_add_disabled(Comment, 'created'):
+            with transaction.atomic():
+                self.in_batches(Comment, comments)
+
+    def rebuild_derived_data(self, images: list):
+        # bulk_create не вызывает сигналы: пересчитываем всё, что они
+        # обычно поддерживают.
+        self.log('Счётчики, ленты, поисковый индекс, миниатюры')
+        post_images.fill_stored(images)
+        # Версии лент сбрасывает rebuild_derived.
+        for name in images:
+            variants.store(name, variants.build(name))
+        bulk.rebuild_derived(batch_size=self.batch_size)
+        for name in images:
+            for geometry, options in settings.POST_THUMBNAILS:
+                thumbnails.generate(name, geometry, dict(options))
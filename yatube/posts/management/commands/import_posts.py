@@ -0,0 +1,219 @@
+import csv
+import gzip
+import json
+import os
+from itertools import islice
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import bulk, images, thumbnails, variants
+from posts.models import Comment, Group, Post, User
+from posts.storage import content_storage
+
+# Не больше 500: столько строк SQLite принимает в одном INSERT,
+# а Django 2.2 не урезает явно заданный batch_size.
+INSERT_BATCH = 500
+
+
+def read_records(path: str):
+    """Записи JSONL или CSV (в том числе .gz) по одной, без загрузки всего."""
+    opener = gzip.open if path.endswith('.gz') else open
+    name = path[:-3] if path.endswith('.gz') else path
+    with opener(path, 'rt', encoding='utf-8', newline='') as file:
+        if name.endswith('.csv'):
+            yield from csv.DictReader(file)
+            return
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as error:
+                raise CommandError(f'{path}, строка {number}: {error}')
+
+
+def batches(records, size: int):
+    records = iter(records)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Массово импортирует посты и комментарии из JSONL или CSV. '
+        'Пост: text, author (username), group (slug), pub_date, image '
+        '(имя файла в --images-dir), id (для ссылок из комментариев). '
+        'Комментарий: post (id поста из файла), author, text, created. '
+        'Счётчики, ленты, поиск, сведения о картинках и миниатюры '
+        'пересчитываются в конце.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('posts', help='Файл постов .jsonl/.csv[.gz].')
+        parser.add_argument('--comments', help='Файл комментариев.')
+        parser.add_argument(
+            '--images-dir', help='Каталог с картинками постов.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Строк в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.images_dir = options['images_dir']
+        self.authors = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.images = {}
+        self.skipped = 0
+        self.imported = {Post: 0, Comment: 0}
+        # id поста в файле -> pk в базе, для комментариев.
+        self.posts = {}
+        last_post = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        try:
+            with bulk.auto_now_add_disabled(Post, 'pub_date'):
+                self.import_rows(Post, options['posts'], self.build_post)
+            if options['comments']:
+                with bulk.auto_now_add_disabled(Comment, 'created'):
+                    self.import_rows(
+                        Comment, options['comments'], self.build_comment
+                    )
+        finally:
+            # Пакеты до ошибки уже зафиксированы - им тоже нужны
+            # счётчики, ленты и индекс.
+            self.rebuild(last_post)
+        self.stdout.write(self.style.SUCCESS(
+            f'Постов: {self.imported[Post]}, комментариев: '
+            f'{self.imported[Comment]}, пропущено строк: {self.skipped}'
+        ))
+
+    def rebuild(self, last_post: int) -> None:
+        self.stdout.write('Счётчики, ленты, поисковый индекс, миниатюры')
+        # Разные имена с одним содержимым указывают на один файл.
+        stored = sorted(set(filter(None, self.images.values())))
+        images.fill_stored(stored)
+        bulk.rebuild_derived(after=last_post)
+        for name in stored:
+            thumbnails.queue_post_image(name)
+            variants.queue(name)
+
+    @staticmethod
+    def insert(model, objects: list) -> None:
+        """
+        Вставляет пакет, ключи назначает база: явные pk столкнулись бы
+        с постами, которые создаются параллельно с импортом.
+        """
+        with transaction.atomic():
+            model.objects.bulk_create(objects, batch_size=INSERT_BATCH)
+            if not objects or objects[0].pk is not None:
+                return
+            # SQLite не возвращает ключи из bulk_create. Транзакция
+            # держит блокировку записи, так что последние строки - наши.
+            pks = model.objects.order_by('-pk').values_list(
+                'pk', flat=True
+            )[:len(objects)]
+            for obj, pk in zip(objects, reversed(list(pks))):
+                obj.pk = pk
+
+    def import_rows(self, model, path: str, build) -> None:
+        if not os.path.exists(path):
+            raise CommandError(f'Нет файла {path}')
+        for batch in batches(read_records(path), self.batch_size):
+            objects, ids = [], []
+            for record in batch:
+                obj = build(record)
+                if obj is None:
+                    self.skipped += 1
+                    continue
+                objects.append(obj)
+                ids.append(record.get('id'))
+            self.insert(model, objects)
+            if model is Post:
+                # Комментарии ссылаются на посты по id из файла.
+                self.posts.update(
+                    (str(record_id), obj.pk)
+                    for record_id, obj in zip(ids, objects) if record_id
+                )
+            self.imported[model] += len(objects)
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {self.imported[model]}'
+            )
+
+    def author_id(self, username: str) -> int:
+        if username not in self.authors:
+            self.authors[username] = User.objects.create_user(username).pk
+        return self.authors[username]
+
+    def group_id(self, slug: str):
+        if not slug:
+            return None
+        if slug not in self.groups:
+            self.groups[slug] = Group.objects.create(
+                title=slug, slug=slug
+            ).pk
+        return self.groups[slug]
+
+    def image(self, name: str) -> str:
+        """Копирует картинку в хранилище один раз на имя файла."""
+        if not name or not self.images_dir:
+            return ''
+        if name not in self.images:
+            path = os.path.join(self.images_dir, os.path.basename(name))
+            if not os.path.isfile(path):
+                self.images[name] = ''
+            else:
+                with open(path, 'rb') as file:
+                    self.images[name] = content_storage.save(
+                        f'posts/{os.path.basename(name)}', File(file)
+                    )
+        return self.images[name]
+
+    @staticmethod
+    def date(value):
+        """Дата из файла; без неё - сейчас, неразборчивая - None."""
+        if not value:
+            return timezone.now()
+        try:
+            parsed = parse_datetime(value)
+        except ValueError:
+            # Формат верный, но такого дня нет: 2021-02-30.
+            return None
+        if parsed is None:
+            return None
+        if timezone.is_naive(parsed):
+            return timezone.make_aware(parsed)
+        return parsed
+
+    def build_post(self, record: dict):
+        pub_date = self.date(record.get('pub_date'))
+        if not (record.get('text') and record.get('author') and pub_date):
+            return None
+        return Post(
+            text=record['text'],
+            author_id=self.author_id(record['author']),
+            group_id=self.group_id(record.get('group')),
+            image=self.image(record.get('image')),
+            pub_date=pub_date,
+        )
+
+    def build_comment(self, record: dict):
+        post_id = self.posts.get(str(record.get('post')))
+        created = self.date(record.get('created'))
+        if not (post_id and record.get('text') and record.get('author')
+                and created):
+            return None
+        return Comment(
+            post_id=post_id,
+            author_id=self.author_id(record['author']),
+            text=record['text'],
+            created=created,
+        )
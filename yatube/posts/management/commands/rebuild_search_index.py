@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов (SQLite FTS5).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько постов индексировать за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        if not search.fts_available():
+            self.stdout.write(
+                'Индекс FTS5 не используется: PostgreSQL обновляет '
+                'GIN-индекс сам, либо SQLite собран без FTS5.'
+            )
+            return
+        search.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Индекс перестроен.'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import stats
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики UserStats с базой и исправляет расхождения.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не менять.',
+        )
+
+    def handle(self, *args, **options):
+        drifted, created = stats.reconcile(
+            options['dry_run'], log=self.stdout.write
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Расхождений: {drifted}, создано строк: {created}'
+        ))
@@ -0,0 +1,186 @@
+# posts/media_gc.py
+"""
+Сборка мусора в MEDIA_ROOT.
+
+Замена картинки в post_edit и удаление поста (в том числе каскадом
+от пользователя) оставляют на диске исходник, его варианты и
+миниатюры sorl. collect сначала собирает все пути, на которые
+ссылается база: картинки постов, файлы из их манифестов вариантов и
+миниатюры из KV-хранилища sorl для этих картинок. Пути хранятся
+8-байтовыми хэшами, так что набор компактен и для миллионов файлов.
+Затем каталоги posts/ и cache/ обходятся os.scandir, и файлы без
+ссылок удаляются или переносятся в карантин порциями.
+
+Свежие файлы (моложе min_age) не трогаются: загрузку могли сохранить,
+но ещё не привязать к посту. Повторная загрузка того же содержимого
+обновляет время файла (posts.storage), а перед удалением порции
+исходников ссылки на них перепроверяются в базе.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from .models import Blob, Post
+from .storage import content_storage
+
+KEY_SIZE = 8
+BATCH_SIZE = 500
+MIN_AGE = 60 * 60 * 24
+
+
+class References:
+    """Множество путей в виде коротких хэшей."""
+
+    def __init__(self):
+        self._keys = set()
+
+    @staticmethod
+    def _key(name: str) -> bytes:
+        return hashlib.blake2b(name.encode(), digest_size=KEY_SIZE).digest()
+
+    def add(self, name: str) -> None:
+        self._keys.add(self._key(name))
+
+    def __contains__(self, name: str) -> bool:
+        return self._key(name) in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+def referenced() -> Tuple[References, List[str]]:
+    """
+    Пути, на которые ссылается база, и ключи sorl для исходников,
+    на которые уже никто не ссылается.
+    """
+    references = References()
+    posts = Post.objects.order_by()
+    images = posts.exclude(image='').exclude(image__isnull=True)
+    for name in images.values_list('image', flat=True).distinct().iterator():
+        references.add(name)
+    for manifest in posts.filter(image_variants__isnull=False).values_list(
+        'image_variants', flat=True
+    ).distinct().iterator():
+        for variants in json.loads(manifest)['variants'].values():
+            for _, name in variants:
+                references.add(name)
+    # Закрытые методы KV-хранилища - те же, что в его cleanup().
+    kvstore = default.kvstore
+    stale = []
+    for key in kvstore._find_keys(identity='thumbnails'):
+        source = kvstore._get(key)
+        if source is None or source.name not in references:
+            stale.append(key)
+            continue
+        for thumbnail_key in kvstore._get(key, identity='thumbnails') or []:
+            thumbnail = kvstore._get(thumbnail_key)
+            if thumbnail is not None:
+                references.add(thumbnail.name)
+    return references, stale
+
+
+def walk(root: str,
+         directory: str) -> Iterator[Tuple[str, str, os.stat_result]]:
+    """Файлы каталога и подкаталогов: (имя в хранилище, путь, stat)."""
+    try:
+        entries = os.scandir(os.path.join(root, directory))
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            name = f'{directory}/{entry.name}'
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk(root, name)
+            elif entry.is_file(follow_symlinks=False):
+                yield name, entry.path, entry.stat(follow_symlinks=False)
+
+
+def _forget_thumbnails(keys: List[str]) -> None:
+    # Иначе sorl считал бы удалённые миниатюры готовыми.
+    kvstore = default.kvstore
+    for key in keys:
+        for thumbnail_key in kvstore._get(key, identity='thumbnails') or []:
+            kvstore._delete(thumbnail_key)
+        kvstore._delete(key, identity='thumbnails')
+        kvstore._delete(key)
+
+
+class Collector:
+
+    def __init__(self, dry_run: bool = False,
+                 quarantine: Optional[str] = None,
+                 log: Optional[Callable[[str], None]] = None):
+        self.dry_run = dry_run
+        self.quarantine = quarantine
+        self.log = log
+        self.files = 0
+        self.bytes = 0
+
+    def remove(self, batch: List[Tuple[str, str, int]]) -> None:
+        names = [name for name, _, _ in batch]
+        # Файл мог только что получить ссылку от нового поста.
+        alive = set(
+            Post.objects.filter(image__in=names).values_list(
+                'image', flat=True
+            )
+        )
+        removed = []
+        for name, path, size in batch:
+            if name in alive:
+                continue
+            if self.log:
+                self.log(name)
+            if not self.dry_run and not self._remove(name, path):
+                continue
+            removed.append(name)
+            self.files += 1
+            self.bytes += size
+        if not self.dry_run:
+            Blob.objects.filter(name__in=removed).delete()
+
+    def _remove(self, name: str, path: str) -> bool:
+        try:
+            if self.quarantine:
+                target = os.path.join(self.quarantine, name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(path, target)
+            else:
+                os.remove(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+
+def collect(dry_run: bool = False, quarantine: Optional[str] = None,
+            min_age: int = MIN_AGE, batch_size: int = BATCH_SIZE,
+            log: Optional[Callable[[str], None]] = None) -> Tuple[int, int]:
+    """
+    Удаляет (или переносит в quarantine) файлы без ссылок из базы.
+    Возвращает число файлов и байтов; при dry_run - сколько было бы.
+    """
+    references, stale = referenced()
+    collector = Collector(dry_run, quarantine, log)
+    cutoff = time.time() - min_age
+    root = content_storage.location
+    batch = []
+    for directory in (
+        Post._meta.get_field('image').upload_to.rstrip('/'),
+        thumbnail_settings.THUMBNAIL_PREFIX.rstrip('/'),
+    ):
+        for name, path, stat in walk(root, directory):
+            if name in references or stat.st_mtime > cutoff:
+                continue
+            batch.append((name, path, stat.st_size))
+            if len(batch) == batch_size:
+                collector.remove(batch)
+                batch = []
+    collector.remove(batch)
+    if not dry_run:
+        _forget_thumbnails(stale)
+    return collector.files, collector.bytes
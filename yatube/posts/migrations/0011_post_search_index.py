@@ -0,0 +1,53 @@
+# Generated by Django 2.2.16 on 2026-10-17 12:00
+
+from django.db import migrations, OperationalError
+
+from posts.stemmer import stems
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS posts_post_text_fts_idx '
+            'ON posts_post USING GIN (to_tsvector(\'russian\', "text"))'
+        )
+        return
+    if vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts USING fts5('
+            "text, tokenize='unicode61 remove_diacritics 2')"
+        )
+    except OperationalError:
+        # SQLite собран без FTS5 - поиск откатится на LIKE.
+        return
+    Post = apps.get_model('posts', 'Post')
+    rows = [
+        (pk, ' '.join(stems(text)))
+        for pk, text in Post.objects.values_list('pk', 'text').iterator()
+    ]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO posts_post_fts (rowid, text) VALUES (%s, %s)', rows
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS posts_post_text_fts_idx')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_userstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
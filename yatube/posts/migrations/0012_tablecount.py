@@ -0,0 +1,43 @@
+# Generated by Django 2.2.16 on 2026-10-18 00:23
+
+from django.db import migrations, models
+
+from ._count_triggers import COUNTED_TABLES, create_triggers, drop_triggers
+
+
+def create_count_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    TableCount = apps.get_model('posts', 'TableCount')
+    for table in COUNTED_TABLES:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {table}')
+            rows = cursor.fetchone()[0]
+        TableCount.objects.create(name=table, rows=rows)
+    create_triggers(schema_editor)
+
+
+def drop_count_triggers(apps, schema_editor):
+    drop_triggers(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_post_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableCount',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Таблица')),
+                ('rows', models.BigIntegerField(default=0, verbose_name='Строк')),
+            ],
+            options={
+                'verbose_name': 'Размер таблицы',
+                'verbose_name_plural': 'Размеры таблиц',
+            },
+        ),
+        migrations.RunPython(create_count_triggers, drop_count_triggers),
+    ]
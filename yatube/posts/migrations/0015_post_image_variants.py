@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-18 00:45
+
+from django.db import migrations, models
+
+from ._count_triggers import create_triggers
+
+
+def recreate_count_triggers(apps, schema_editor):
+    # SQLite добавляет столбцы, пересоздавая таблицу, и триггеры
+    # счётчика строк из 0012 пропадают вместе со старой таблицей.
+    create_triggers(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_image_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_variants',
+            field=models.TextField(blank=True, null=True, verbose_name='Варианты картинки'),
+        ),
+        migrations.RunPython(
+            recreate_count_triggers, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 2.2.16 on 2026-10-18 00:48
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+from django.db.models import Count
+
+import posts.storage
+from ._count_triggers import create_triggers
+
+
+def recreate_count_triggers(apps, schema_editor):
+    # SQLite добавляет столбцы, пересоздавая таблицу, и триггеры
+    # счётчика строк из 0012 пропадают вместе со старой таблицей.
+    create_triggers(schema_editor)
+
+
+def count_existing_images(apps, schema_editor):
+    Blob = apps.get_model('posts', 'Blob')
+    Post = apps.get_model('posts', 'Post')
+    references = (
+        Post.objects.exclude(image='').exclude(image__isnull=True)
+        .order_by().values_list('image').annotate(total=Count('pk'))
+    )
+    blobs = []
+    for name, total in references.iterator():
+        try:
+            size = default_storage.size(name)
+        except (OSError, SuspiciousFileOperation):
+            size = 0
+        blobs.append(Blob(name=name, size=size, refs=total))
+    Blob.objects.bulk_create(blobs, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Файл')),
+                ('size', models.BigIntegerField(default=0, verbose_name='Размер, байт')),
+                ('refs', models.PositiveIntegerField(default=0, verbose_name='Ссылок')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Сохранён')),
+            ],
+            options={
+                'verbose_name': 'Файл картинки',
+                'verbose_name_plural': 'Файлы картинок',
+            },
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['image'], name='post_image_idx'),
+        ),
+        migrations.RunPython(
+            recreate_count_triggers, migrations.RunPython.noop
+        ),
+        migrations.RunPython(
+            count_existing_images, migrations.RunPython.noop
+        ),
+    ]
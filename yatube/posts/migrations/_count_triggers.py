@@ -0,0 +1,40 @@
+# posts/migrations/_count_triggers.py
+"""
+Триггеры счётчика строк posts_tablecount на SQLite (posts.counting).
+
+Код заморожен вместе с миграциями, которые его вызывают: менять его
+нельзя, новые таблицы - новым модулем. SQLite меняет столбцы, заново
+создавая таблицу, и триггеры COUNTED_TABLES пропадают вместе со
+старой. Поэтому каждая миграция, которая пересоздаёт posts_post или
+posts_comment (AddField, RemoveField, AlterField, ...), должна
+заканчиваться RunPython(create_triggers). Забытый вызов ловит
+test_counting.CountingTests.test_count_triggers_installed.
+"""
+
+COUNTED_TABLES = ('posts_post', 'posts_comment')
+TRIGGER_EVENTS = (('INSERT', '+ 1'), ('DELETE', '- 1'))
+
+
+def create_triggers(schema_editor) -> None:
+    if schema_editor.connection.vendor != 'sqlite':
+        # На PostgreSQL оценку даёт pg_class.reltuples.
+        return
+    drop_triggers(schema_editor)
+    for table in COUNTED_TABLES:
+        for event, delta in TRIGGER_EVENTS:
+            schema_editor.execute(
+                f'CREATE TRIGGER {table}_count_{event.lower()} '
+                f'AFTER {event} ON {table} BEGIN '
+                f'UPDATE posts_tablecount SET rows = rows {delta} '
+                f"WHERE name = '{table}'; END"
+            )
+
+
+def drop_triggers(schema_editor) -> None:
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in COUNTED_TABLES:
+        for event, _ in TRIGGER_EVENTS:
+            schema_editor.execute(
+                f'DROP TRIGGER IF EXISTS {table}_count_{event.lower()}'
+            )
@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import content_storage
+
 User = get_user_model()
 
 
@@ -48,12 +50,34 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=content_storage,
         blank=True,
         null=True,
     )
+    # Заполняется PostForm при загрузке (posts.images).
+    image_blurhash = models.CharField(
+        'BlurHash картинки', max_length=100, null=True, blank=True
+    )
+    # JSON с готовыми вариантами для <picture> (posts.variants).
+    image_variants = models.TextField(
+        'Варианты картинки', null=True, blank=True
+    )
 
     class Meta:
         ordering = ("-pub_date",)
+        indexes = [
+            models.Index(fields=['pub_date'], name='post_pub_date_idx'),
+            models.Index(
+                fields=['author', 'pub_date'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', 'pub_date'],
+                name='post_group_pub_date_idx',
+            ),
+            # Посты одного файла: счётчики ссылок и общие варианты.
+            models.Index(fields=['image'], name='post_image_idx'),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -83,6 +107,13 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ("-created",)
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx',
+            ),
+            models.Index(fields=['created'], name='comment_created_idx'),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -109,3 +140,87 @@ class Follow(models.Model):
             models.UniqueConstraint(name='unique_follow',
                                     fields=['user', 'author'])
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx',
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    pub_date = models.DateTimeField('Дата публикации поста')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(name='unique_timeline_entry',
+                                    fields=['user', 'post'])
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'post'],
+                name='timeline_user_pub_date_idx',
+            ),
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, которые поддерживаются сигналами."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    comments_count = models.PositiveIntegerField('Комментариев', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+
+class TableCount(models.Model):
+    """Число строк таблицы; на SQLite его поддерживают триггеры."""
+    name = models.CharField('Таблица', max_length=100, primary_key=True)
+    rows = models.BigIntegerField('Строк', default=0)
+
+    class Meta:
+        verbose_name = 'Размер таблицы'
+        verbose_name_plural = 'Размеры таблиц'
+
+
+class Blob(models.Model):
+    """
+    Файл картинки в хранилище и число постов, которые на него
+    ссылаются (posts.blobs). Файл без ссылок удаляет сборщик мусора.
+    """
+    name = models.CharField('Файл', max_length=255, unique=True)
+    size = models.BigIntegerField('Размер, байт', default=0)
+    refs = models.PositiveIntegerField('Ссылок', default=0)
+    created = models.DateTimeField('Сохранён', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,155 @@
+# posts/search.py
+"""
+Полнотекстовый поиск по постам.
+
+SQLite: виртуальная таблица FTS5 posts_post_fts (rowid = id поста)
+с основами слов из posts.stemmer; её поддерживают сигналы Post.
+PostgreSQL: GIN-индекс по to_tsvector('russian', text), который база
+обновляет сама. Найденные посты аннотируются рангом search_rank:
+чем меньше, тем релевантнее.
+"""
+from typing import Optional
+
+from django.db import connection, transaction
+from django.db.models import BooleanField, FloatField, QuerySet, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+from .stemmer import stems
+
+FTS_TABLE = 'posts_post_fts'
+PG_VECTOR = "to_tsvector('russian', \"posts_post\".\"text\")"
+PG_QUERY = "plainto_tsquery('russian', %s)"
+
+_fts_available = None
+
+
+class RowIds(RawSQL):
+    """
+    Подзапрос для pk__in. RawSQL сам берёт SQL в скобки, и получается
+    IN ((SELECT ...)) - SQLite считает это скалярным подзапросом.
+    """
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def fts_available() -> bool:
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_available
+
+
+def document(text: str) -> str:
+    """Текст в том виде, в котором он хранится в индексе FTS5."""
+    return ' '.join(stems(text))
+
+
+def fts_query(query: str) -> str:
+    """Запрос FTS5: все основы слов запроса, каждая в кавычках."""
+    return ' '.join(f'"{word}"' for word in stems(query))
+
+
+def index_post(post: Post) -> None:
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, text) '
+            f'VALUES (%s, %s)',
+            [post.pk, document(post.text)],
+        )
+
+
+def unindex_post(post_id: int) -> None:
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+        )
+
+
+def unindex_posts(posts: QuerySet) -> None:
+    """Убирает из индекса посты кварисета (values('pk')) одним DELETE."""
+    if not fts_available():
+        return
+    sql, params = posts.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({sql})', params
+        )
+
+
+@transaction.atomic
+def rebuild(batch_size: int = 1000, after: Optional[int] = None) -> None:
+    """
+    Перестраивает индекс FTS5 по всем постам, а с after - только
+    дописывает посты с pk больше after.
+    """
+    if not fts_available():
+        return
+    posts = Post.objects.values_list('pk', 'text').order_by()
+    with connection.cursor() as cursor:
+        if after is None:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        else:
+            posts = posts.filter(pk__gt=after)
+        batch = []
+        for pk, text in posts.iterator(chunk_size=batch_size):
+            batch.append((pk, document(text)))
+            if len(batch) == batch_size:
+                cursor.executemany(
+                    f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, text) '
+                    f'VALUES (%s, %s)',
+                    batch,
+                )
+                batch = []
+        cursor.executemany(
+            f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, text) '
+            f'VALUES (%s, %s)',
+            batch,
+        )
+
+
+def filter_posts(queryset: QuerySet, query: str) -> QuerySet:
+    """Оставляет в кварисете только посты, найденные по запросу."""
+    if connection.vendor == 'postgresql':
+        return queryset.annotate(
+            search_match=RawSQL(
+                f'{PG_VECTOR} @@ {PG_QUERY}', [query],
+                output_field=BooleanField(),
+            )
+        ).filter(search_match=True)
+    if not fts_available():
+        return queryset.filter(text__icontains=query)
+    match = fts_query(query)
+    if not match:
+        return queryset.none()
+    return queryset.filter(pk__in=RowIds(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]
+    ))
+
+
+def search_posts(query: str) -> QuerySet:
+    """Найденные посты с рангом search_rank (по возрастанию - лучшие)."""
+    posts = filter_posts(Post.objects.all(), query)
+    if connection.vendor == 'postgresql':
+        rank = RawSQL(
+            f'-ts_rank({PG_VECTOR}, {PG_QUERY})', [query],
+            output_field=FloatField(),
+        )
+    elif fts_available():
+        rank = RawSQL(
+            f'SELECT bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = "posts_post"."id"',
+            [fts_query(query)],
+            output_field=FloatField(),
+        )
+    else:
+        rank = Value(0.0, output_field=FloatField())
+    return posts.annotate(search_rank=rank).order_by('search_rank', 'pk')
@@ -0,0 +1,199 @@
+# posts/signals.py
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import (
+    blobs, events, feed_cache, search, stats, thumbnails, timeline, variants,
+)
+from .models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.bump(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    stats.bump(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.bump(instance.author_id, 'comments_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    stats.bump(instance.author_id, 'comments_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.bump(instance.author_id, 'followers_count', 1)
+        stats.bump(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    stats.bump(instance.author_id, 'followers_count', -1)
+    stats.bump(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.publish(instance)
+
+
+@receiver(post_save, sender=Post)
+def announce_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        transaction.on_commit(lambda: events.publish_post(instance))
+
+
+@receiver(post_save, sender=Follow)
+def add_to_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.follow(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def remove_from_timeline(sender, instance, **kwargs):
+    timeline.unfollow(instance.user_id, instance.author_id)
+
+
+@receiver(pre_save, sender=Post)
+def remember_saved_post(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._saved_group_id, instance._saved_image = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'image'
+            ).first() or (None, None)
+        )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    feed_cache.bump(
+        'global',
+        f'author:{instance.author_id}',
+        f'group:{instance.group_id}',
+        f'group:{getattr(instance, "_saved_group_id", None)}',
+        f'post:{instance.pk}',
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_post_comments(sender, instance, **kwargs):
+    feed_cache.bump(
+        f'post:{instance.post_id}', f'profile:{instance.author_id}'
+    )
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_profiles(sender, instance, **kwargs):
+    # Счётчики подписок и кнопка подписки в шапке профиля.
+    feed_cache.bump(
+        f'profile:{instance.author_id}', f'profile:{instance.user_id}'
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_feeds(sender, instance, **kwargs):
+    feed_cache.bump('global', 'groups', f'group:{instance.pk}')
+
+
+# Поля пользователя, которые видны в лентах и комментариях.
+AUTHOR_NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=User)
+def remember_saved_names(sender, instance, raw=False, update_fields=None,
+                         **kwargs):
+    instance._saved_names = None
+    if raw or not instance.pk:
+        return
+    # Вход сохраняет только last_login - старые имена читать незачем.
+    if update_fields and not update_fields & set(AUTHOR_NAME_FIELDS):
+        return
+    instance._saved_names = User.objects.filter(pk=instance.pk).values_list(
+        *AUTHOR_NAME_FIELDS
+    ).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_feeds(sender, instance, created, **kwargs):
+    saved = getattr(instance, '_saved_names', None)
+    names = tuple(getattr(instance, field) for field in AUTHOR_NAME_FIELDS)
+    if created or saved is None or saved == names:
+        return
+    # Имя автора есть в лентах его групп и в комментариях под постами.
+    groups = Post.objects.filter(author=instance).values_list(
+        'group_id', flat=True
+    ).distinct()
+    posts = Comment.objects.filter(author=instance).values_list(
+        'post_id', flat=True
+    ).distinct()
+    feed_cache.bump(
+        'global',
+        f'author:{instance.pk}',
+        *(f'group:{group_id}' for group_id in groups),
+        *(f'post:{post_id}' for post_id in posts),
+    )
+
+
+@receiver(post_save, sender=Post)
+def queue_thumbnails(sender, instance, raw=False, **kwargs):
+    image = instance.image.name if instance.image else None
+    if not image or raw:
+        return
+    changed = image != getattr(instance, '_saved_image', None)
+    if changed:
+        thumbnails.queue_post_image(image)
+    # Тот же файл, загруженный при правке, получает то же имя, а форма
+    # уже сбросила его варианты.
+    if changed or instance.image_variants is None:
+        variants.queue(image)
+
+
+@receiver(post_save, sender=Post)
+def count_image_references(sender, instance, raw=False, **kwargs):
+    image = instance.image.name if instance.image else ''
+    saved = getattr(instance, '_saved_image', None) or ''
+    if not raw and image != saved:
+        blobs.acquire(image)
+        blobs.release(saved)
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    blobs.release(instance.image.name if instance.image else '')
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
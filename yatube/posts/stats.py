@@ -0,0 +1,127 @@
+# posts/stats.py
+"""Денормализованные счётчики пользователя (UserStats)."""
+from typing import Callable, Iterable, Optional, Tuple
+
+from django.contrib.auth import get_user_model
+from django.db.models import (Count, F, IntegerField, OuterRef, QuerySet,
+                              Subquery)
+from django.db.models.functions import Coalesce
+
+from tasks.broker import task
+
+from .models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+# Не больше 500: столько строк SQLite принимает в одном INSERT,
+# а Django 2.2 не урезает явно заданный batch_size.
+BATCH_SIZE = 500
+
+COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+    'comments_count': (Comment, 'author'),
+}
+
+
+def bump(user_id: int, field: str, delta: int) -> None:
+    """Атомарно сдвигает счётчик пользователя на delta."""
+    rows = UserStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        rows = rows.filter(**{f'{field}__gte': -delta})
+    updated = rows.update(**{field: F(field) + delta})
+    if not updated and delta > 0 and User.objects.filter(
+            pk=user_id).exists():
+        recount(user_id)
+
+
+def _counted(model, field: str) -> Coalesce:
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by()
+    return Coalesce(
+        Subquery(
+            rows.values(field).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def actual_counts() -> QuerySet:
+    """Пользователи с фактическими значениями всех счётчиков."""
+    return User.objects.annotate(**{
+        f'actual_{name}': _counted(model, field)
+        for name, (model, field) in COUNTERS.items()
+    }).order_by('pk')
+
+
+def recount(user_id: int) -> UserStats:
+    """Пересчитывает счётчики одного пользователя по базе."""
+    user = actual_counts().get(pk=user_id)
+    stats, _ = UserStats.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            name: getattr(user, f'actual_{name}') for name in COUNTERS
+        },
+    )
+    return stats
+
+
+@task()
+def recount_users(user_ids: Iterable[int]) -> None:
+    """Пересчитывает счётчики пользователей, затронутых массовой правкой."""
+    for user_id in user_ids:
+        if User.objects.filter(pk=user_id).exists():
+            recount(user_id)
+
+
+@task(max_attempts=1)
+def reconcile(dry_run: bool = False,
+              log: Optional[Callable[[str], None]] = None) -> Tuple[int, int]:
+    """
+    Сверяет все счётчики с базой и исправляет расхождения. Возвращает
+    число исправленных и созданных строк UserStats.
+    """
+    stored = {
+        stats.user_id: stats
+        for stats in UserStats.objects.iterator(chunk_size=BATCH_SIZE)
+    }
+    drifted, missing = [], []
+    for user in actual_counts().iterator(chunk_size=BATCH_SIZE):
+        actual = {
+            name: getattr(user, f'actual_{name}') for name in COUNTERS
+        }
+        stats = stored.get(user.pk)
+        if stats is None:
+            missing.append(UserStats(user_id=user.pk, **actual))
+            continue
+        changed = {
+            name: value for name, value in actual.items()
+            if getattr(stats, name) != value
+        }
+        if not changed:
+            continue
+        if log:
+            log(f'{user.username}: ' + ', '.join(
+                f'{name} {getattr(stats, name)} -> {value}'
+                for name, value in changed.items()
+            ))
+        for name, value in changed.items():
+            setattr(stats, name, value)
+        drifted.append(stats)
+    if dry_run:
+        return len(drifted), 0
+    UserStats.objects.bulk_create(missing, batch_size=BATCH_SIZE)
+    UserStats.objects.bulk_update(
+        drifted, list(COUNTERS), batch_size=BATCH_SIZE
+    )
+    return len(drifted), len(missing)
+
+
+def of(user) -> UserStats:
+    """Счётчики пользователя; создаёт строку, если её ещё нет."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        user.stats = recount(user.pk)
+        return user.stats
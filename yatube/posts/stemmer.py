@@ -0,0 +1,120 @@
+# posts/stemmer.py
+"""
+Стеммер русского языка по алгоритму Snowball.
+
+https://snowballstem.org/algorithms/russian/stemmer.html
+SQLite FTS5 умеет стемминг только для английского, поэтому в индекс
+и в запрос попадают уже обрезанные основы слов.
+"""
+import re
+from typing import Iterable, List, Optional
+
+VOWELS = 'аеиоуыэюя'
+TOKEN_RE = re.compile(r'\w+')
+
+PERFECTIVE_GERUND_1 = ('в', 'вши', 'вшись')
+PERFECTIVE_GERUND_2 = ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись')
+ADJECTIVE = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE_1 = ('ем', 'нн', 'вш', 'ющ', 'щ')
+PARTICIPLE_2 = ('ивш', 'ывш', 'ующ')
+REFLEXIVE = ('ся', 'сь')
+VERB_1 = (
+    'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+    'ют', 'ны', 'ть', 'ешь', 'нно',
+)
+VERB_2 = (
+    'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+    'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+    'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+)
+NOUN = (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+)
+SUPERLATIVE = ('ейш', 'ейше')
+DERIVATIONAL = ('ост', 'ость')
+
+
+def _remove(
+        word: str,
+        after_a: Iterable[str] = (),
+        anywhere: Iterable[str] = (),
+) -> Optional[str]:
+    """
+    Отрезает самое длинное подходящее окончание. Окончания группы
+    after_a допустимы только после "а" или "я". None - ничего не нашли.
+    """
+    best, needs_a = '', False
+    for endings, flag in ((after_a, True), (anywhere, False)):
+        for ending in endings:
+            if word.endswith(ending) and len(ending) > len(best):
+                best, needs_a = ending, flag
+    if not best:
+        return None
+    stem = word[:-len(best)]
+    if needs_a and not stem.endswith(('а', 'я')):
+        return None
+    return stem
+
+
+def _region(word: str, start: int) -> int:
+    """Начало области после первой согласной, идущей за гласной."""
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _inflection(rv: str) -> str:
+    """Шаг 1: окончания деепричастий, прилагательных, глаголов, имён."""
+    removed = _remove(rv, PERFECTIVE_GERUND_1, PERFECTIVE_GERUND_2)
+    if removed is not None:
+        return removed
+    reflexive = _remove(rv, anywhere=REFLEXIVE)
+    if reflexive is not None:
+        rv = reflexive
+    removed = _remove(rv, anywhere=ADJECTIVE)
+    if removed is not None:
+        participle = _remove(removed, PARTICIPLE_1, PARTICIPLE_2)
+        return removed if participle is None else participle
+    removed = _remove(rv, VERB_1, VERB_2)
+    if removed is None:
+        removed = _remove(rv, anywhere=NOUN)
+    return rv if removed is None else removed
+
+
+def _tidy(rv: str) -> str:
+    """Шаг 4: двойное "н", превосходная степень и мягкий знак."""
+    if rv.endswith('нн'):
+        return rv[:-1]
+    superlative = _remove(rv, anywhere=SUPERLATIVE)
+    if superlative is not None:
+        return superlative[:-1] if superlative.endswith('нн') else superlative
+    return rv[:-1] if rv.endswith('ь') else rv
+
+
+def stem(word: str) -> str:
+    word = word.lower().replace('ё', 'е')
+    match = re.search(f'[{VOWELS}]', word)
+    if match is None:
+        return word
+    prefix, rv = word[:match.end()], word[match.end():]
+    r2 = _region(word, _region(word, 0))
+
+    rv = _inflection(rv)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    derivational = _remove(rv, anywhere=DERIVATIONAL)
+    if derivational is not None and len(prefix + derivational) >= r2:
+        rv = derivational
+    return prefix + _tidy(rv)
+
+
+def stems(text: str) -> List[str]:
+    """Основы всех слов текста."""
+    return [stem(token) for token in TOKEN_RE.findall(text)]
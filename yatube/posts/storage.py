@@ -0,0 +1,60 @@
+# posts/storage.py
+"""
+Хранилище картинок постов с адресацией по содержимому.
+
+Файл сохраняется под SHA-256 своего содержимого:
+posts/ab/ab12...ef.jpg. Тысяча загрузок одного мема дают один файл,
+а значит одну миниатюру sorl и один набор вариантов (posts.variants):
+все они привязаны к имени файла. Хэш считают обработчики загрузки
+(posts.uploads) прямо во время приёма; для остальных файлов хранилище
+дочитывает его само. Число ссылок на файл ведёт posts.blobs.
+"""
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASH_ATTRIBUTE = 'sha256'
+
+
+def content_hash(content) -> str:
+    """SHA-256 файла: готовый из обработчика загрузки или по чтению."""
+    digest = getattr(content, HASH_ATTRIBUTE, None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        hasher.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return hasher.hexdigest()
+
+
+def hashed_name(name: str, digest: str) -> str:
+    directory = os.path.dirname(name)
+    extension = os.path.splitext(name)[1].lower()
+    return os.path.join(directory, digest[:2], f'{digest}{extension}')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage, который хранит каждое содержимое один раз."""
+
+    def _save(self, name, content):
+        target = hashed_name(name, content_hash(content))
+        if self.exists(target):
+            # Свежее время не даст сборщику мусора (posts.media_gc)
+            # удалить файл, пока новый пост ещё не сохранён.
+            os.utime(self.path(target))
+            return target
+        saved = super()._save(target, content)
+        if saved != target:
+            # Тот же файл одновременно сохранил другой запрос.
+            self.delete(saved)
+        return target
+
+
+content_storage = ContentAddressedStorage()
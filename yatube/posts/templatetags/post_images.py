@@ -0,0 +1,26 @@
+# posts/templatetags/post_images.py
+from django import template
+
+from .. import blurhash, variants
+
+register = template.Library()
+
+
+@register.filter
+def blurhash_url(value):
+    """Размытая заглушка картинки по её BlurHash."""
+    if not value:
+        return ''
+    try:
+        return blurhash.data_url(value)
+    except (ValueError, IndexError):
+        return ''
+
+
+@register.inclusion_tag('posts/includes/post_image.html')
+def post_picture(post):
+    """
+    Картинка поста: <picture> с вариантами по форматам и ширинам, а
+    пока их нет - миниатюра sorl.
+    """
+    return {'post': post, 'picture': variants.picture(post)}
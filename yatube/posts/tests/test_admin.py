@@ -0,0 +1,117 @@
+from django.contrib.admin import ACTION_CHECKBOX_NAME
+from django.contrib.auth.models import User as AdminUser
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from tasks.worker import Worker
+
+from .. import feed_cache, search
+from ..models import Comment, Group, Post, TimelineEntry, User
+
+
+class PostAdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.reader = User.objects.create_user(username='TestReader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug'
+        )
+        cls.admin = AdminUser.objects.create_superuser(
+            'admin', 'admin@example.com', 'pass'
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow(self):
+        """Тест число запросов списка не зависит от числа строк"""
+        urls = (
+            reverse('admin:posts_post_changelist'),
+            reverse('admin:posts_comment_changelist'),
+        )
+        post = Post.objects.create(
+            text='пост', author=self.author, group=self.group
+        )
+        Comment.objects.create(post=post, author=self.reader, text='ок')
+        before = [self.changelist_queries(url) for url in urls]
+        for i in range(10):
+            author = User.objects.create_user(username=f'author{i}')
+            group = Group.objects.create(title=f'g{i}', slug=f'g{i}')
+            post = Post.objects.create(text='пост', author=author,
+                                       group=group)
+            Comment.objects.create(post=post, author=author, text='ок')
+        after = [self.changelist_queries(url) for url in urls]
+        self.assertEqual(after, before)
+
+    def test_long_text_truncated(self):
+        """Тест в списке показывается только начало длинного текста"""
+        Post.objects.create(text='слово ' * 1000, author=self.author)
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertNotContains(response, 'слово ' * 20)
+        self.assertContains(response, '…')
+
+    def test_move_to_group_single_update(self):
+        """Тест перенос в группу одним UPDATE со сбросом кэша"""
+        posts = [
+            Post.objects.create(text='пост', author=self.author)
+            for _ in range(5)
+        ]
+        version = feed_cache.versions(f'group:{self.group.pk}')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('admin:posts_post_changelist'), {
+                'action': 'move_to_group',
+                'group': self.group.pk,
+                ACTION_CHECKBOX_NAME: [post.pk for post in posts],
+            })
+        updates = [
+            query for query in queries
+            if query['sql'].startswith('UPDATE "posts_post"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.group.posts.count(), 5)
+        self.assertNotEqual(
+            feed_cache.versions(f'group:{self.group.pk}'), version
+        )
+
+    def test_delete_posts_cleans_related_data(self):
+        """Тест удаление постов чистит комментарии, ленты и индекс"""
+        posts = [
+            Post.objects.create(text='удаляемый пост', author=self.author)
+            for _ in range(3)
+        ]
+        kept = Post.objects.create(text='удаляемый тоже', author=self.author)
+        for post in posts:
+            Comment.objects.create(post=post, author=self.reader, text='ок')
+            TimelineEntry.objects.create(
+                user=self.reader, post=post,
+                pub_date=post.pub_date,
+            )
+        self.client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'delete_posts',
+            ACTION_CHECKBOX_NAME: [post.pk for post in posts],
+        })
+        Worker().run_pending()
+        self.assertEqual(list(Post.objects.all()), [kept])
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+        if search.fts_available():
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT rowid FROM {search.FTS_TABLE}')
+                self.assertEqual(cursor.fetchall(), [(kept.pk,)])
+        self.assertEqual(
+            User.objects.get(pk=self.author.pk).stats.posts_count, 1
+        )
+        self.assertEqual(
+            User.objects.get(pk=self.reader.pk).stats.comments_count, 0
+        )
@@ -0,0 +1,83 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..models import Comment, Follow, Post, TimelineEntry, User, UserStats
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchmarkCommandsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'generate_dataset', users=30, groups=3, posts=200,
+            comments=100, images=2, follows=5, stdout=StringIO(),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_dataset_is_consistent(self):
+        """Тест сгенерированные данные согласованы с производными"""
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        self.assertEqual(
+            UserStats.objects.count(), User.objects.count()
+        )
+        top = UserStats.objects.order_by('-followers_count').first()
+        self.assertEqual(
+            top.followers_count,
+            Follow.objects.filter(author_id=top.user_id).count(),
+        )
+        self.assertEqual(
+            TimelineEntry.objects.count(),
+            sum(
+                Post.objects.filter(author_id=author_id).count()
+                for author_id in Follow.objects.values_list(
+                    'author_id', flat=True
+                )
+            ),
+        )
+
+    def test_benchmark_compares_with_baseline(self):
+        """Тест бенчмарк пишет JSON и сравнивает с базовой линией"""
+        output = os.path.join(TEMP_MEDIA_ROOT, 'latest.json')
+        baseline = os.path.join(TEMP_MEDIA_ROOT, 'baseline.json')
+        follows = Follow.objects.count()
+        call_command(
+            'benchmark', runs=2, warmup=0, output=output,
+            baseline=baseline, save_baseline=True, stdout=StringIO(),
+        )
+        # Подписки не менялись, адреса-перенаправления не замерялись.
+        self.assertEqual(Follow.objects.count(), follows)
+        with open(baseline, encoding='utf-8') as file:
+            report = json.load(file)
+        self.assertIn('follow_index', report['results'])
+        for name in ('profile_follow', 'profile_unfollow', 'add_comment'):
+            self.assertNotIn(name, report['results'])
+        self.assertTrue(all(
+            result['status'] == 200 for result in report['results'].values()
+        ))
+        self.assertEqual(report['results']['index']['status'], 200)
+        report['results']['index']['queries'] = 0
+        with open(baseline, 'w', encoding='utf-8') as file:
+            json.dump(report, file)
+        stdout = StringIO()
+        call_command(
+            'benchmark', runs=2, warmup=0, output=output,
+            baseline=baseline, stdout=stdout,
+        )
+        self.assertIn('index: p95', stdout.getvalue())
@@ -0,0 +1,85 @@
+from django.contrib.auth.models import User as AdminUser
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import counting
+from ..models import Comment, Post, TableCount, User
+
+
+@override_settings(COUNT_ESTIMATE_THRESHOLD=3)
+class CountingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+
+    def rows(self, model):
+        return TableCount.objects.get(name=model._meta.db_table).rows
+
+    def test_triggers_track_table_size(self):
+        """Тест счётчик строк следует за вставками и удалениями"""
+        Post.objects.bulk_create(
+            [Post(text='пост', author=self.author) for _ in range(5)]
+        )
+        post = Post.objects.create(text='пост', author=self.author)
+        Comment.objects.create(post=post, author=self.author, text='ок')
+        self.assertEqual(self.rows(Post), 6)
+        self.assertEqual(self.rows(Comment), 1)
+        post.delete()
+        self.assertEqual(self.rows(Post), 5)
+        self.assertEqual(self.rows(Comment), 0)
+
+    def test_count_triggers_installed(self):
+        """Тест после всех миграций триггеры счётчика на месте"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                "AND name LIKE '%_count_%'"
+            )
+            names = {row[0] for row in cursor.fetchall()}
+        self.assertEqual(names, {
+            f'{table}_count_{event}'
+            for table in ('posts_post', 'posts_comment')
+            for event in ('insert', 'delete')
+        })
+
+    def test_estimate_only_for_big_unfiltered_tables(self):
+        """Тест оценка только для большой таблицы без условий"""
+        Post.objects.bulk_create(
+            [Post(text='пост', author=self.author) for _ in range(5)]
+        )
+        TableCount.objects.filter(name=Post._meta.db_table).update(
+            rows=1000
+        )
+        self.assertEqual(counting.count(Post.objects.all()), 1000)
+        self.assertEqual(counting.count(Post.objects.all(), exact=True), 5)
+        self.assertEqual(
+            counting.count(Post.objects.filter(author=self.author)), 5
+        )
+        with override_settings(COUNT_ESTIMATE_THRESHOLD=10000):
+            self.assertEqual(counting.count(Post.objects.all()), 5)
+
+    def test_pages_and_admin_skip_count(self):
+        """Тест лента с ?page= и админка не выполняют COUNT(*)"""
+        Post.objects.bulk_create(
+            [Post(text='пост', author=self.author) for _ in range(25)]
+        )
+        admin = AdminUser.objects.create_superuser(
+            'admin', 'admin@example.com', 'pass'
+        )
+        client = Client()
+        client.force_login(admin)
+        urls = [
+            reverse('posts:index') + '?page=2',
+            reverse('admin:posts_post_changelist'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(
+                    any('COUNT(' in query['sql'] for query in queries)
+                )
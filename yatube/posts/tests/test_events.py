@@ -0,0 +1,94 @@
+import json
+
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import events
+from ..models import Follow, Post, User
+
+
+@override_settings(EVENTS_HEARTBEAT=0.01, LIVE_UPDATES=True)
+class PostEventsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.other = User.objects.create_user(username='TestOther')
+        cls.reader = User.objects.create_user(username='TestReader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def open_stream(self, client, scope, **headers):
+        response = client.get(
+            reverse('posts:post_events'), {'scope': scope}, **headers
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = iter(response.streaming_content)
+        self.assertTrue(next(chunks).startswith(b'retry:'))
+        return chunks
+
+    def next_event(self, chunks):
+        for chunk in chunks:
+            if chunk.startswith(b'event:'):
+                return chunk.decode()
+        return None
+
+    def test_new_post_pushed_to_index(self):
+        """Тест новый пост приходит событием в поток главной"""
+        chunks = self.open_stream(self.reader_client, 'index')
+        self.assertEqual(next(chunks), b': ping\n\n')
+        post = Post.objects.create(text='новый пост', author=self.other)
+        events.publish_post(post)
+        event = self.next_event(chunks)
+        self.assertIn(f'id: {post.pk}', event)
+        self.assertIn(json.dumps({'count': 1}), event)
+
+    def test_follow_stream_skips_other_authors(self):
+        """Тест поток подписок пропускает посты чужих авторов"""
+        chunks = self.open_stream(self.reader_client, 'follow')
+        next(chunks)
+        events.publish_post(Post.objects.create(text='a', author=self.other))
+        post = Post.objects.create(text='b', author=self.author)
+        events.publish_post(post)
+        self.assertIn(f'id: {post.pk}', self.next_event(chunks))
+
+    def test_reconnect_reports_missed_posts(self):
+        """Тест после переподключения приходят пропущенные посты"""
+        first = Post.objects.create(text='a', author=self.author)
+        Post.objects.create(text='b', author=self.other)
+        last = Post.objects.create(text='c', author=self.author)
+        chunks = self.open_stream(
+            self.reader_client, 'follow', HTTP_LAST_EVENT_ID=str(first.pk)
+        )
+        event = next(chunks).decode()
+        self.assertIn(json.dumps({'count': 1}), event)
+        self.assertIn(f'id: {last.pk}', event)
+
+    def test_stream_requires_login(self):
+        """Тест поток событий недоступен анониму"""
+        for scope in ('index', 'follow'):
+            with self.subTest(scope=scope):
+                response = Client().get(
+                    reverse('posts:post_events'), {'scope': scope}
+                )
+                self.assertEqual(response.status_code, 403)
+        self.assertNotContains(
+            Client().get(reverse('posts:index')), 'EventSource'
+        )
+        self.assertContains(
+            self.reader_client.get(reverse('posts:index')), 'EventSource'
+        )
+
+    @override_settings(LIVE_UPDATES=False)
+    def test_disabled_by_setting(self):
+        """Тест без LIVE_UPDATES поток и скрипт не отдаются"""
+        response = self.reader_client.get(
+            reverse('posts:post_events'), {'scope': 'index'}
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertNotContains(
+            self.reader_client.get(reverse('posts:index')), 'EventSource'
+        )
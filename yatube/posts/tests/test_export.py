@@ -0,0 +1,89 @@
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth.models import User as AdminUser
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post, User
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='д'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'пост, "{i}"', author=cls.author, group=cls.group
+            )
+            for i in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.author, text='комментарий'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def export(self, *args, **options):
+        path = os.path.join(TEMP_DIR, 'export')
+        call_command('export_data', *args, output=path, **options)
+        with open(path, 'rb') as file:
+            return file.read()
+
+    def test_jsonl_export_after_pk(self):
+        """Тест JSONL содержит строки с pk больше after"""
+        lines = self.export(
+            'posts', after=self.posts[1].pk, chunk_size=2
+        ).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [record['id'] for record in records],
+            [post.pk for post in self.posts[2:]],
+        )
+        self.assertEqual(records[0]['text'], 'пост, "2"')
+        self.assertEqual(records[0]['group_id'], self.group.pk)
+
+    def test_csv_gzip_export(self):
+        """Тест сжатый CSV распаковывается с заголовком и всеми строками"""
+        content = gzip.decompress(
+            self.export('comments', format='csv', gzip=True)
+        ).decode()
+        table = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(
+            table[0], ['id', 'post_id', 'author_id', 'text', 'created']
+        )
+        self.assertEqual(table[1][3], 'комментарий')
+        self.assertEqual(len(table), 2)
+
+    def test_endpoint_streams_for_staff_only(self):
+        """Тест выгрузка по адресу доступна только персоналу"""
+        url = reverse('posts:export', kwargs={'table': 'groups'})
+        client = Client()
+        client.force_login(self.author)
+        self.assertEqual(client.get(url).status_code, 302)
+        client.force_login(AdminUser.objects.create_superuser(
+            'admin', 'admin@example.com', 'pass'
+        ))
+        response = client.get(url, {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        self.assertIn('groups.csv', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('test-slug', content)
+        missing = reverse('posts:export', kwargs={'table': 'users'})
+        self.assertEqual(client.get(missing).status_code, 404)
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -71,12 +72,13 @@ class PostsFormTests(TestCase):
             'posts:profile', kwargs={'username': self.user.username}
         ))
         self.assertEqual(Post.objects.count(), posts_count + 1)
+        digest = hashlib.sha256(self.small_gif).hexdigest()
         self.assertTrue(
             Post.objects.filter(
                 group=self.group,
                 author=self.user,
                 text='Тестовый пост',
-                image='posts/test_img.gif',
+                image=f'posts/{digest[:2]}/{digest}.gif',
             ).exists()
         )
 
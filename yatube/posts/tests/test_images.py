@@ -0,0 +1,174 @@
+import io
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image, ImageStat
+
+from tasks.worker import Worker
+
+from .. import blurhash, variants
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageMetadataTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser_YP')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def upload(self):
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'пост с картинкой',
+            'image': SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        })
+        return Post.objects.get(text='пост с картинкой')
+
+    def test_upload_fills_metadata(self):
+        """Тест при загрузке картинки сохраняется её BlurHash"""
+        post = self.upload()
+        self.assertTrue(post.image_blurhash)
+
+    def test_page_reserves_image_box(self):
+        """Тест у картинки в ленте заданы размеры и ленивая загрузка"""
+        post = self.upload()
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertContains(response, 'width="960"')
+        self.assertContains(response, 'height="339"')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, 'data:image/png;base64,')
+
+    def test_backfill_command(self):
+        """Тест backfill_image_metadata заполняет старые посты"""
+        post = self.upload()
+        blurhash_value = post.image_blurhash
+        Post.objects.update(image_blurhash=None)
+        Post.objects.create(
+            text='пропавший файл', author=self.user, image='posts/gone.gif'
+        )
+        out = io.StringIO()
+        call_command('backfill_image_metadata', stdout=out)
+        post.refresh_from_db()
+        self.assertEqual(post.image_blurhash, blurhash_value)
+        self.assertIn('не прочитано: 1', out.getvalue())
+
+    def test_blurhash_round_trip(self):
+        """Тест BlurHash однотонной картинки раскодируется в тот же цвет"""
+        image = Image.new('RGB', (64, 48), (200, 40, 90))
+        decoded = blurhash.decode(blurhash.encode(image), 32, 24)
+        for channel, expected in zip(
+            ImageStat.Stat(decoded).mean, (200, 40, 90)
+        ):
+            self.assertAlmostEqual(channel, expected, delta=2)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageVariantTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser_YP')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @staticmethod
+    def photo(size=(1280, 720)):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, (30, 120, 200)).save(buffer, 'JPEG')
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue(), 'image/jpeg')
+
+    def create_post(self, size=(1280, 720)):
+        return Post.objects.create(
+            text='пост с картинкой', author=self.user, image=self.photo(size)
+        )
+
+    def test_generate_builds_ladder(self):
+        """Тест варианты нарезаются по лесенке ширин без увеличения"""
+        post = self.create_post(size=(700, 400))
+        variants.generate(post.image.name)
+        post.refresh_from_db()
+        manifest = json.loads(post.image_variants)
+        self.assertEqual(manifest['fallback'], 'jpeg')
+        self.assertEqual(
+            [width for width, _ in manifest['variants']['jpeg']],
+            [320, 480, 640],
+        )
+        for items in manifest['variants'].values():
+            for width, name in items:
+                self.assertTrue(name.startswith(post.image.name[:-4]))
+                with default_storage.open(name) as file:
+                    self.assertEqual(Image.open(file).width, width)
+
+    def test_reupload_after_delete_gets_variants(self):
+        """Тест картинка удалённого поста снова нарезается для нового"""
+        self.create_post().delete()
+        Worker().run_pending()
+        post = self.create_post()
+        Worker().run_pending()
+        post.refresh_from_db()
+        self.assertIsNotNone(post.image_variants)
+
+    def test_same_file_on_edit_keeps_variants(self):
+        """Тест правка с тем же файлом снова получает варианты"""
+        post = self.create_post()
+        Worker().run_pending()
+        self.client.force_login(self.user)
+        self.client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            {'text': 'новый текст', 'image': self.photo()},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'новый текст')
+        Worker().run_pending()
+        post.refresh_from_db()
+        self.assertIsNotNone(post.image_variants)
+
+    def test_skips_unsupported_formats(self):
+        """Тест форматы без поддержки в Pillow пропускаются"""
+        with mock.patch.dict(Image.SAVE, {'WEBP': None}):
+            Image.SAVE.pop('AVIF', None)
+            self.assertEqual(variants.available_formats(), ['webp', 'jpeg'])
+
+    def test_page_renders_picture(self):
+        """Тест после нарезки лента отдаёт <picture> со srcset"""
+        post = self.create_post()
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        self.assertNotContains(self.client.get(url), '<picture>')
+        variants.generate(post.image.name)
+        response = self.client.get(url)
+        self.assertContains(response, '<picture>')
+        self.assertContains(response, '_320w.jpg 320w')
+        self.assertContains(response, 'sizes="')
+        self.assertContains(response, 'width="960"')
@@ -0,0 +1,133 @@
+import csv
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .. import search
+from ..models import (
+    Blob, Comment, Follow, Group, Post, TimelineEntry, User,
+)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.reader = User.objects.create_user(username='TestReader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+        cls.source = tempfile.mkdtemp(dir=TEMP_MEDIA_ROOT)
+        with open(os.path.join(cls.source, 'cat.gif'), 'wb') as file:
+            file.write(SMALL_GIF)
+        with open(os.path.join(cls.source, 'posts.jsonl'), 'w') as file:
+            for record in (
+                {'id': 'a1', 'text': 'Старый пост про котов',
+                 'author': 'TestAuthor', 'group': 'test-slug',
+                 'pub_date': '2015-05-01T10:00:00+00:00',
+                 'image': 'cat.gif'},
+                {'id': 'a2', 'text': 'Пост нового автора',
+                 'author': 'newcomer', 'group': 'new-group'},
+                {'id': 'a3', 'text': '', 'author': 'TestAuthor'},
+            ):
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        with open(os.path.join(cls.source, 'comments.csv'), 'w') as file:
+            writer = csv.writer(file)
+            writer.writerow(['post', 'author', 'text', 'created'])
+            writer.writerow(['a1', 'TestReader', 'Отличные коты', ''])
+            writer.writerow(['missing', 'TestReader', 'Нет поста', ''])
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_import_with_deferred_rebuild(self):
+        """Тест импорт сохраняет данные и пересчитывает производные"""
+        stdout = StringIO()
+        call_command(
+            'import_posts', os.path.join(self.source, 'posts.jsonl'),
+            comments=os.path.join(self.source, 'comments.csv'),
+            images_dir=self.source, batch_size=1, stdout=stdout,
+        )
+        self.assertIn('пропущено строк: 2', stdout.getvalue())
+        post = Post.objects.get(text='Старый пост про котов')
+        self.assertEqual(
+            post.pub_date,
+            datetime.datetime(2015, 5, 1, 10, tzinfo=timezone.utc),
+        )
+        self.assertEqual(post.group, self.group)
+        digest = hashlib.sha256(SMALL_GIF).hexdigest()
+        self.assertEqual(post.image.name, f'posts/{digest[:2]}/{digest}.gif')
+        self.assertEqual(Blob.objects.get(name=post.image.name).refs, 1)
+        self.assertEqual(post.comments.get().text, 'Отличные коты')
+        newcomer = Post.objects.get(author__username='newcomer')
+        self.assertEqual(newcomer.group.slug, 'new-group')
+        self.assertEqual(
+            User.objects.get(pk=self.author.pk).stats.posts_count, 1
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(list(search.search_posts('кот')), [post])
+        created = Post.objects.create(text='после импорта',
+                                      author=self.author)
+        self.assertGreater(created.pk, newcomer.pk)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_impossible_date_skips_row(self):
+        """Тест строка с несуществующей датой пропускается"""
+        path = os.path.join(self.source, 'dates.jsonl')
+        with open(path, 'w') as file:
+            for pub_date in ('2021-02-30T00:00:00', '2021-02-28T00:00:00'):
+                file.write(json.dumps(
+                    {'text': pub_date, 'author': 'TestAuthor',
+                     'pub_date': pub_date},
+                ) + '\n')
+        stdout = StringIO()
+        call_command('import_posts', path, stdout=stdout)
+        self.assertIn('пропущено строк: 1', stdout.getvalue())
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)),
+            ['2021-02-28T00:00:00'],
+        )
+
+    def test_broken_line_keeps_committed_batches_consistent(self):
+        """Тест ошибка в файле не оставляет без лент и индекса"""
+        path = os.path.join(self.source, 'broken.jsonl')
+        with open(path, 'w') as file:
+            file.write(json.dumps(
+                {'text': 'Пост до ошибки', 'author': 'TestAuthor'},
+                ensure_ascii=False,
+            ) + '\n')
+            file.write('{не json\n')
+        with self.assertRaisesMessage(CommandError, 'строка 2'):
+            call_command('import_posts', path, batch_size=1, stdout=StringIO())
+        post = Post.objects.get(text='Пост до ошибки')
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(
+            User.objects.get(pk=self.author.pk).stats.posts_count, 1
+        )
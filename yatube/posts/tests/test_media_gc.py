@@ -0,0 +1,107 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from .. import media_gc, thumbnails, variants
+from ..models import Blob, Post, User
+from ..storage import content_storage
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (400, 300), color).save(buffer, 'JPEG')
+    return SimpleUploadedFile('photo.jpg', buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaGarbageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser_YP')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # KV-хранилище sorl кэширует записи между тестами.
+        cache.clear()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        self.kept = self.create_post((10, 200, 10))
+        orphan = self.create_post((200, 10, 10))
+        self.orphan_name = orphan.image.name
+        self.orphan_thumbnails = self.files(self.orphan_name)
+        orphan.delete()
+
+    def create_post(self, color):
+        post = Post.objects.create(
+            text='пост', author=self.user, image=image(color)
+        )
+        for geometry, options in settings.POST_THUMBNAILS:
+            thumbnails.generate(post.image.name, geometry, dict(options))
+        variants.generate(post.image.name)
+        return post
+
+    def files(self, name):
+        """Исходник, его варианты и миниатюры на диске."""
+        source = ImageFile(name, content_storage)
+        thumbnail_keys = default.kvstore._get(
+            source.key, identity='thumbnails'
+        )
+        names = [default.kvstore._get(key).name for key in thumbnail_keys]
+        stem = os.path.splitext(name)[0]
+        _, shard = content_storage.listdir(os.path.dirname(name))
+        return [name] + names + [
+            f'{os.path.dirname(name)}/{file}' for file in shard
+            if f'{os.path.dirname(name)}/{file}'.startswith(f'{stem}_')
+        ]
+
+    def exists(self, name):
+        return content_storage.exists(name)
+
+    def test_dry_run_keeps_files(self):
+        """Тест --dry-run только считает файлы без ссылок"""
+        files, size = media_gc.collect(dry_run=True, min_age=0)
+        self.assertEqual(files, len(self.orphan_thumbnails))
+        self.assertGreater(size, 0)
+        self.assertTrue(all(map(self.exists, self.orphan_thumbnails)))
+
+    def test_removes_orphans_and_keeps_referenced(self):
+        """Тест удаляются только файлы удалённого поста"""
+        kept = self.files(self.kept.image.name)
+        out = io.StringIO()
+        call_command('gc_media', min_age=0, stdout=out)
+        self.assertIn(f'файлов: {len(self.orphan_thumbnails)}', out.getvalue())
+        self.assertFalse(any(map(self.exists, self.orphan_thumbnails)))
+        self.assertTrue(all(map(self.exists, kept)))
+        self.assertFalse(Blob.objects.filter(name=self.orphan_name).exists())
+        source = ImageFile(self.orphan_name, content_storage)
+        self.assertIsNone(default.kvstore.get(source))
+
+    def test_quarantine(self):
+        """Тест --quarantine переносит файлы вместо удаления"""
+        quarantine = os.path.join(TEMP_MEDIA_ROOT, 'quarantine')
+        media_gc.collect(quarantine=quarantine, min_age=0)
+        self.assertFalse(self.exists(self.orphan_name))
+        self.assertTrue(
+            os.path.exists(os.path.join(quarantine, self.orphan_name))
+        )
+
+    def test_fresh_files_are_kept(self):
+        """Тест файлы моложе --min-age не трогаются"""
+        self.assertEqual(media_gc.collect(), (0, 0))
+        self.assertTrue(self.exists(self.orphan_name))
@@ -0,0 +1,56 @@
+import json
+import logging
+
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post, User
+
+
+@override_settings(PERF_SAMPLE_RATE=1.0, PERF_SERVER_TIMING=True)
+class PerformanceMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        Post.objects.create(text='Тестовый пост', author=cls.author)
+
+    def setUp(self):
+        self.url = reverse(
+            'posts:profile', kwargs={'username': self.author.username}
+        )
+
+    def test_server_timing_header(self):
+        """Тест ответ несёт заголовок Server-Timing с замерами"""
+        response = Client().get(self.url)
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'cache;desc=', 'total;dur='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, timing)
+
+    def test_log_line_counts_queries(self):
+        """Тест строка лога содержит число запросов к базе"""
+        logger = logging.getLogger('yatube.perf')
+        # Уровень из настроек: assertLogs сам понижает его на время теста.
+        self.assertTrue(logger.isEnabledFor(logging.DEBUG))
+        with self.assertLogs('yatube.perf', 'DEBUG') as logs:
+            with self.assertNumQueries(2):
+                Client().get(self.url)
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['view'], 'posts:profile')
+        self.assertEqual(record['db_queries'], 2)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertGreaterEqual(record['cache_misses'], 1)
+
+    @override_settings(PERF_SLOW_REQUEST_MS=0)
+    def test_slow_request_is_warning(self):
+        """Тест запрос дольше порога пишется с уровнем WARNING"""
+        with self.assertLogs('yatube.perf', 'INFO') as logs:
+            Client().get(self.url)
+        self.assertEqual(logs.records[-1].levelname, 'WARNING')
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_unsampled_request_not_measured(self):
+        """Тест запросы вне выборки не замеряются"""
+        response = Client().get(self.url)
+        self.assertFalse(response.has_header('Server-Timing'))
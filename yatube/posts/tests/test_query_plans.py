@@ -0,0 +1,69 @@
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Follow, Group, Post, User
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class FeedQueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser_YP')
+        cls.author = User.objects.create_user(username='TestAuthor_YP')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Описание группы'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(15):
+            Post.objects.create(
+                text=f'текст поста {i}',
+                author=cls.author,
+                group=cls.group,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def feed_query_plans(self, url):
+        """Планы всех запросов к posts_post, выполненных страницей."""
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or 'posts_post' not in sql:
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plans.append((sql, [row[-1] for row in cursor.fetchall()]))
+        return plans
+
+    def test_feeds_use_indexes_for_order(self):
+        """Ленты берут порядок из индекса, без полного скана и сортировки"""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            plans = self.feed_query_plans(url)
+            self.assertTrue(plans)
+            for sql, plan in plans:
+                with self.subTest(url=url, sql=sql):
+                    for row in plan:
+                        self.assertNotIn('USE TEMP B-TREE', row)
+                        # Полный скан без индекса, в любой строке плана.
+                        self.assertNotRegex(
+                            row, r'^SCAN (TABLE )?posts_post$'
+                        )
@@ -0,0 +1,108 @@
+from django.contrib.auth.models import User as AdminUser
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Post, User
+from ..stemmer import stem
+
+
+class StemmerTests(TestCase):
+    def test_word_forms_share_stem(self):
+        """Тест разные формы слова сводятся к одной основе"""
+        forms = {
+            'книг': ('книга', 'книги', 'книгами'),
+            'красив': ('красивая', 'красивые', 'красивого'),
+            'ежик': ('Ёжик', 'ёжики', 'ежиком'),
+        }
+        for expected, words in forms.items():
+            for word in words:
+                with self.subTest(word=word):
+                    self.assertEqual(stem(word), expected)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def search(self, query, **params):
+        return self.guest_client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+
+    def test_finds_other_word_forms(self):
+        """Тест поиск находит пост по другой форме слова"""
+        post = Post.objects.create(
+            text='Читаем красивые книги', author=self.author
+        )
+        Post.objects.create(text='Про котов', author=self.author)
+        response = self.search('красивая книга')
+        self.assertEqual(list(response.context['page_obj']), [post])
+
+    def test_results_ranked_by_relevance(self):
+        """Тест более релевантный пост идёт первым"""
+        strong = Post.objects.create(
+            text='Книга о книгах', author=self.author
+        )
+        weak = Post.objects.create(
+            text='Длинный рассказ о море, горах, лесах и одной книге',
+            author=self.author,
+        )
+        ranked = list(search.search_posts('книги'))
+        self.assertEqual(ranked, [strong, weak])
+
+    def test_index_follows_edit_and_delete(self):
+        """Тест индекс обновляется при правке и удалении поста"""
+        post = Post.objects.create(text='Старый текст', author=self.author)
+        post.text = 'Новый текст'
+        post.save()
+        self.assertFalse(search.search_posts('старый').exists())
+        self.assertTrue(search.search_posts('новые').exists())
+        post.delete()
+        self.assertFalse(search.search_posts('новые').exists())
+
+    def test_cursor_links_keep_query(self):
+        """Тест ссылки пагинатора сохраняют поисковый запрос"""
+        Post.objects.bulk_create(
+            [Post(text=f'Пост номер {i}', author=self.author)
+             for i in range(15)]
+        )
+        search.rebuild()
+        response = self.search('пост')
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 10)
+        self.assertContains(
+            response,
+            f'?q=%D0%BF%D0%BE%D1%81%D1%82&amp;after='
+            f'{page_obj.paginator.next_cursor}',
+        )
+        second = self.search('пост', after=page_obj.paginator.next_cursor)
+        self.assertEqual(len(second.context['page_obj']), 5)
+        self.assertFalse(
+            set(page_obj) & set(second.context['page_obj'])
+        )
+
+    def test_empty_query_shows_form(self):
+        """Тест без запроса показывается только форма"""
+        response = self.search('')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['page_obj'])
+
+    def test_admin_search_uses_index(self):
+        """Тест поиск в админке идёт по полнотекстовому индексу"""
+        post = Post.objects.create(text='Весёлые ёжики', author=self.author)
+        Post.objects.create(text='Грустные коты', author=self.author)
+        admin = AdminUser.objects.create_superuser(
+            'admin', 'admin@example.com', 'pass'
+        )
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'ёжик'}
+        )
+        self.assertEqual(list(response.context['cl'].result_list), [post])
@@ -0,0 +1,58 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post, User, UserStats
+
+
+class UserStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.reader = User.objects.create_user(username='TestReader')
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_signals_keep_counters(self):
+        """Тест сигналы поддерживают счётчики в актуальном состоянии"""
+        post = Post.objects.create(text='текст', author=self.author)
+        Post.objects.create(text='текст', author=self.author)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='ок')
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.assertEqual(self.stats(self.reader).comments_count, 1)
+        post.delete()
+        follow.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+        self.assertEqual(self.stats(self.reader).comments_count, 0)
+
+    def test_reconcile_stats_fixes_drift(self):
+        """Тест команда reconcile_stats исправляет расхождения"""
+        Post.objects.bulk_create(
+            [Post(text='текст', author=self.author) for _ in range(3)]
+        )
+        UserStats.objects.filter(user=self.reader).delete()
+        call_command('reconcile_stats', stdout=StringIO())
+        self.assertEqual(self.stats(self.author).posts_count, 3)
+        self.assertTrue(UserStats.objects.filter(user=self.reader).exists())
+
+    def test_profile_renders_without_aggregates(self):
+        """Тест профиль и пост выводят счётчики без COUNT(*)"""
+        post = Post.objects.create(text='текст', author=self.author)
+        urls = [
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                with self.assertNumQueries(2):
+                    response = Client().get(url)
+                self.assertContains(response, 'постов')
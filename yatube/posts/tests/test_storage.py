@@ -0,0 +1,91 @@
+import hashlib
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import StopFutureHandlers
+from django.test import TestCase, override_settings
+from django.test.client import RequestFactory
+from django.urls import reverse
+
+from .. import bulk, variants
+from ..models import Blob, Post, User
+from ..storage import content_storage
+from ..uploads import CheckedMemoryFileUploadHandler
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+DIGEST = hashlib.sha256(SMALL_GIF).hexdigest()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser_YP')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def upload(self, text, name='meme.gif'):
+        self.client.post(reverse('posts:post_create'), {
+            'text': text,
+            'image': SimpleUploadedFile(name, SMALL_GIF, 'image/gif'),
+        })
+        return Post.objects.get(text=text)
+
+    def test_same_content_stored_once(self):
+        """Тест одинаковые загрузки ссылаются на один файл"""
+        first = self.upload('первый')
+        second = self.upload('второй', name='copy.GIF')
+        self.assertEqual(first.image.name, f'posts/{DIGEST[:2]}/{DIGEST}.gif')
+        self.assertEqual(second.image.name, first.image.name)
+        _, files = content_storage.listdir(f'posts/{DIGEST[:2]}')
+        self.assertEqual(
+            [name for name in files if name.endswith('.gif')],
+            [f'{DIGEST}.gif'],
+        )
+        blob = Blob.objects.get(name=first.image.name)
+        self.assertEqual((blob.refs, blob.size), (2, len(SMALL_GIF)))
+        first.delete()
+        bulk.delete_posts(Post.objects.filter(pk=second.pk))
+        self.assertEqual(Blob.objects.get(name=blob.name).refs, 0)
+
+    def test_duplicate_reuses_variants(self):
+        """Тест повторная загрузка берёт готовые варианты без задачи"""
+        first = self.upload('первый')
+        variants.generate(first.image.name)
+        with mock.patch.object(variants, 'enqueue') as enqueue:
+            second = self.upload('второй')
+        enqueue.assert_not_called()
+        second.refresh_from_db()
+        self.assertTrue(second.image_variants)
+
+    def test_handler_hashes_while_receiving(self):
+        """Тест обработчик загрузки считает SHA-256 по кускам"""
+        handler = CheckedMemoryFileUploadHandler(RequestFactory().post('/'))
+        handler.handle_raw_input(None, {}, len(SMALL_GIF), 'boundary')
+        with self.assertRaises(StopFutureHandlers):
+            handler.new_file(
+                'image', 'meme.gif', 'image/gif', len(SMALL_GIF)
+            )
+        handler.receive_data_chunk(SMALL_GIF[:10], 0)
+        handler.receive_data_chunk(SMALL_GIF[10:], 10)
+        uploaded = handler.file_complete(len(SMALL_GIF))
+        self.assertEqual(uploaded.sha256, DIGEST)
@@ -0,0 +1,96 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import thumbnails
+from ..models import Group, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser_YP')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def create_post(self, group=None):
+        return Post.objects.create(
+            text='текст поста',
+            author=self.user,
+            group=group,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    def test_new_image_queues_all_geometries(self):
+        """Тест сохранение картинки ставит в очередь все миниатюры"""
+        with mock.patch.object(thumbnails, 'enqueue') as enqueue:
+            post = self.create_post()
+        self.assertEqual(
+            [call.args[1:3] for call in enqueue.call_args_list],
+            [(post.image.name, geometry)
+             for geometry, _ in settings.POST_THUMBNAILS],
+        )
+        with mock.patch.object(thumbnails, 'enqueue') as enqueue:
+            post.text = 'новый текст'
+            post.save()
+        enqueue.assert_not_called()
+
+    def test_page_serves_placeholder_until_generated(self):
+        """Тест страница не генерирует миниатюру, а отдаёт заглушку"""
+        post = self.create_post()
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        with mock.patch(
+            'sorl.thumbnail.base.ThumbnailBackend._create_thumbnail'
+        ) as create:
+            response = self.client.get(url)
+        create.assert_not_called()
+        self.assertContains(response, 'data:image/svg+xml')
+        for geometry, options in settings.POST_THUMBNAILS:
+            thumbnails.generate(post.image.name, geometry, dict(options))
+        response = self.client.get(url)
+        self.assertNotContains(response, 'data:image/svg+xml')
+        self.assertContains(response, settings.MEDIA_URL + 'cache/')
+
+    def test_generated_thumbnail_replaces_cached_placeholder(self):
+        """Тест готовая миниатюра сбрасывает кэш лент с заглушкой"""
+        post = self.create_post(group=self.group)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        for url in urls:
+            self.assertContains(self.client.get(url), 'data:image/svg+xml')
+        for geometry, options in settings.POST_THUMBNAILS:
+            thumbnails.generate(post.image.name, geometry, dict(options))
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertNotContains(response, 'data:image/svg+xml')
+                self.assertContains(response, settings.MEDIA_URL + 'cache/')
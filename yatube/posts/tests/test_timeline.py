@@ -0,0 +1,127 @@
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from tasks.worker import Worker
+
+from .. import timeline
+from ..models import Follow, Post, TimelineEntry, User
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='TestReader')
+        cls.author = User.objects.create_user(username='TestAuthor')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def feed(self, **params):
+        response = self.reader_client.get(
+            reverse('posts:follow_index'), params
+        )
+        return response.context['page_obj']
+
+    def test_new_post_fans_out_to_followers(self):
+        """Тест новый пост попадает в ленты подписчиков"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='текст', author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.reader, post=post, pub_date=post.pub_date
+            ).exists()
+        )
+        self.assertEqual(list(self.feed()), [post])
+
+    def test_follow_and_unfollow_rebuild_timeline(self):
+        """Тест подписка и отписка пересобирают ленту"""
+        posts = [
+            Post.objects.create(text=f'текст {i}', author=self.author)
+            for i in range(3)
+        ]
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 3
+        )
+        self.assertEqual(list(self.feed()), posts[::-1])
+        follow.delete()
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+        self.assertEqual(len(self.feed()), 0)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_merged_on_read(self):
+        """Тест посты популярного автора подмешиваются при чтении"""
+        popular = User.objects.create_user(username='TestPopular')
+        fan = User.objects.create_user(username='TestFan')
+        Follow.objects.create(user=fan, author=popular)
+        Follow.objects.create(user=self.reader, author=popular)
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(text=f'текст {i}', author=author)
+            for i in range(6)
+            for author in (self.author, popular)
+        ]
+        self.assertFalse(
+            TimelineEntry.objects.filter(post__author=popular).exists()
+        )
+        first = self.feed()
+        self.assertEqual(list(first), posts[::-1][:10])
+        second = self.feed(after=first.paginator.next_cursor)
+        self.assertEqual(list(second), posts[::-1][10:])
+
+    @override_settings(TIMELINE_FANOUT_INLINE_LIMIT=2)
+    def test_large_backfill_queued(self):
+        """Тест посты плодовитого автора переносятся в ленту в очереди"""
+        for i in range(3):
+            Post.objects.create(text=f'текст {i}', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+        Worker().run_pending()
+        self.assertEqual(len(self.feed()), 3)
+
+    @override_settings(TIMELINE_FANOUT_INLINE_LIMIT=2)
+    def test_queued_backfill_skipped_after_unfollow(self):
+        """Тест после отписки отложенный перенос постов не выполняется"""
+        for i in range(3):
+            Post.objects.create(text=f'текст {i}', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author).delete()
+        Worker().run_pending()
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_below_limit_fanned_out_again(self):
+        """Тест посты автора, ставшего непопулярным, раскладываются"""
+        fan = User.objects.create_user(username='TestFan')
+        Follow.objects.create(user=self.reader, author=self.author)
+        follow = Follow.objects.create(user=fan, author=self.author)
+        posts = [
+            Post.objects.create(text=f'текст {i}', author=self.author)
+            for i in range(3)
+        ]
+        self.assertEqual(list(self.feed()), posts[::-1])
+        follow.delete()
+        Worker().run_pending()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 3
+        )
+        self.assertEqual(list(self.feed()), posts[::-1])
+        # Автор снова популярен: старые записи не дублируют посты.
+        Follow.objects.create(user=fan, author=self.author)
+        self.assertEqual(list(self.feed()), posts[::-1])
+
+    def test_rebuild_after_skips_existing_entries(self):
+        """Тест дораскладка после импорта не падает на готовых записях"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='текст', author=self.author)
+        timeline.rebuild_all(after=post.pk - 1)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 1
+        )
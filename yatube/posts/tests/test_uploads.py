@@ -0,0 +1,98 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import images
+from ..decoder import Rejected
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def image_file(size=(10, 10), frames=1, fmt='GIF'):
+    buffer = io.BytesIO()
+    pictures = [
+        Image.new('RGB', size, (index * 40, 0, 0)) for index in range(frames)
+    ]
+    pictures[0].save(
+        buffer, fmt, save_all=frames > 1, append_images=pictures[1:]
+    )
+    return SimpleUploadedFile(
+        f'upload.{fmt.lower()}', buffer.getvalue(), f'image/{fmt.lower()}'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class UploadLimitTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser_YP')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def upload(self, file):
+        return self.client.post(reverse('posts:post_create'), {
+            'text': 'пост с картинкой', 'image': file,
+        })
+
+    def assertRejected(self, response, message):
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(message, response.context['form'].errors['image'][0])
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_BYTES=20)
+    def test_byte_limit_while_receiving(self):
+        """Тест файл больше предела отклоняется ещё при приёме"""
+        self.assertRejected(
+            self.upload(SimpleUploadedFile('big.gif', SMALL_GIF)),
+            'Файл больше',
+        )
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=1)
+    def test_pixel_limit_from_header(self):
+        """Тест размеры из заголовка проверяются до декодирования"""
+        self.assertRejected(
+            self.upload(SimpleUploadedFile('wide.gif', SMALL_GIF)),
+            'Картинка слишком большая',
+        )
+
+    @override_settings(POST_IMAGE_MAX_FRAMES=2)
+    def test_frame_limit(self):
+        """Тест анимация с лишними кадрами отклоняется"""
+        self.assertRejected(
+            self.upload(image_file(frames=3)), 'Слишком много кадров'
+        )
+
+    def test_valid_upload_gets_metadata_from_decoder(self):
+        """Тест допустимая картинка сохраняется со сведениями"""
+        self.upload(image_file(size=(30, 20)))
+        post = Post.objects.get()
+        self.assertTrue(post.image_blurhash)
+
+    @override_settings(POST_IMAGE_DECODE_MEMORY=100 * 1024 * 1024)
+    def test_decoder_memory_cap(self):
+        """Тест декодирование сверх предела памяти не роняет процесс"""
+        with self.assertRaisesMessage(Rejected, 'памяти'):
+            images.decode(image_file(size=(4000, 4000), fmt='PNG'))
@@ -1,15 +1,19 @@
 import shutil
 import tempfile
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.shortcuts import get_object_or_404
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Follow, Group, Post, User
+from ..models import Comment, Follow, Group, Post, User
+from ..utilities import CursorPaginator
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -159,16 +163,55 @@ class PostsViewsTests(TestCase):
         """Тест работоспособности кэша."""
         response = self.authorized_client.get(reverse('posts:index'))
         posts = response.content
-        Post.objects.create(
-            text='тестовый пост',
-            author=self.user,
-        )
+        # bulk_create не отправляет сигналов - версия ленты прежняя.
+        Post.objects.bulk_create([
+            Post(text='тестовый пост', author=self.user),
+        ])
         response_old = self.authorized_client.get(reverse('posts:index'))
         self.assertEqual(response_old.content, posts)
         cache.clear()
         response_new = self.authorized_client.get(reverse('posts:index'))
         self.assertNotEqual(response_old.content, response_new.content)
 
+    def test_feed_cache_invalidated_on_changes(self):
+        """Тест изменения постов и групп сразу видны в лентах."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        ]
+        for url in urls:
+            self.authorized_client.get(url)
+        post = Post.objects.create(
+            text='свежий пост', author=self.user, group=self.group
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'свежий пост')
+        post.delete()
+        self.group.title = 'Новое название'
+        self.group.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertNotContains(response, 'свежий пост')
+                self.assertContains(response, 'Новое название')
+
+    def test_feed_cache_key_includes_page(self):
+        """Тест страницы ленты кэшируются отдельно."""
+        Post.objects.bulk_create([
+            Post(text=f'пост {i}', author=self.user) for i in range(10)
+        ])
+        cache.clear()
+        first = self.authorized_client.get(reverse('posts:index'))
+        cursor = first.context['page_obj'].paginator.next_cursor
+        second = self.authorized_client.get(
+            reverse('posts:index'), {'after': cursor}
+        )
+        self.assertContains(second, 'текст поста')
+        self.assertNotContains(first, 'текст поста')
+
 
 class PaginatorViewsTest(TestCase):
     @classmethod
@@ -214,6 +257,76 @@ class PaginatorViewsTest(TestCase):
                 response = self.client.get(value + '?page=2')
                 self.assertEqual(len(response.context['page_obj']), expected)
 
+    def test_page_links_do_not_grow_with_pages(self):
+        """Тест число ссылок на страницы не зависит от числа страниц"""
+        Post.objects.bulk_create(
+            [Post(text=f'пост {i}', author=self.user) for i in range(1000)]
+        )
+        response = self.client.get(reverse('posts:index'), {'page': 50})
+        paginator = response.context['page_obj'].paginator
+        self.assertEqual(paginator.num_pages, 102)
+        self.assertEqual(
+            paginator.elided_page_range,
+            [1, 2, '…', 47, 48, 49, 50, 51, 52, 53, '…', 101, 102],
+        )
+        self.assertContains(response, 'class="page-item', count=17)
+
+    def test_cursor_pages(self):
+        """Тест курсорной пагинации вперёд и назад"""
+        for url in self.url_names_keys:
+            with self.subTest(url=url):
+                cache.clear()
+                first = self.client.get(url).context['page_obj']
+                self.assertEqual(len(first), 10)
+                self.assertFalse(first.has_previous())
+                self.assertTrue(first.has_next())
+                cache.clear()
+                second = self.client.get(
+                    url, {'after': first.paginator.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second), 3)
+                self.assertFalse(second.has_next())
+                self.assertEqual(
+                    set(first).intersection(second), set()
+                )
+                cache.clear()
+                back = self.client.get(
+                    url, {'before': second.paginator.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+
+    def test_cursor_page_does_not_count(self):
+        """Тест курсорная страница не выполняет COUNT(*)"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:index'))
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries)
+        )
+
+    def test_broken_cursor_returns_first_page(self):
+        """Тест испорченный курсор открывает первую страницу"""
+        response = self.client.get(
+            reverse('posts:index'), {'after': 'не-курсор'}
+        )
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_wrong_cursor_values_return_first_page(self):
+        """Тест курсор с значениями не того типа открывает первую страницу"""
+        self.client.force_login(self.user)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:follow_index'),
+            reverse('posts:search') + '?q=текст',
+        )
+        for values in (['x', 'y'], [1, 2], [{}, {}], [None, None]):
+            cursor = CursorPaginator.encode_cursor(values)
+            for url in urls:
+                with self.subTest(values=values, url=url):
+                    response = self.client.get(url, {'after': cursor})
+                    self.assertEqual(response.status_code, 200)
+
 
 class FollowTests(TestCase):
     @classmethod
@@ -279,3 +392,188 @@ class FollowTests(TestCase):
             'posts:profile_follow',
             kwargs={'username': self.user_following.username}))
         self.assertEqual(Follow.objects.count(), follower_count + 1)
+
+    def test_profile_loads_following_with_author(self):
+        """Тест подписка читателя грузится одним запросом с автором"""
+        url = reverse(
+            'posts:profile',
+            kwargs={'username': self.user_following.username},
+        )
+        # Сессия, читатель, автор со счётчиками и подпиской, страница.
+        with self.assertNumQueries(4):
+            response = self.follower_client.get(url)
+        self.assertFalse(response.context['following'])
+        Follow.objects.create(
+            user=self.user_follower, author=self.user_following
+        )
+        response = self.follower_client.get(url)
+        self.assertTrue(response.context['following'])
+
+
+class CommentsViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.post = Post.objects.create(text='текст поста', author=cls.author)
+        cls.url = reverse('posts:post_detail', kwargs={'post_id': cls.post.pk})
+
+    def add_comments(self, count):
+        start = Comment.objects.count()
+        for i in range(start, start + count):
+            Comment.objects.create(
+                post=self.post,
+                author=User.objects.create_user(username=f'TestUser_{i}'),
+                text=f'комментарий {i}',
+            )
+
+    def count_queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        return len(queries)
+
+    def test_comments_query_count_is_constant(self):
+        """Тест число запросов не растёт вместе с комментариями"""
+        self.add_comments(1)
+        few = self.count_queries()
+        self.add_comments(30)
+        self.assertEqual(self.count_queries(), few)
+
+    def test_comments_are_paginated(self):
+        """Тест комментарии листаются курсорами"""
+        self.add_comments(25)
+        first = self.client.get(self.url).context['comments']
+        self.assertEqual(len(first), 20)
+        second = self.client.get(
+            self.url, {'comments_after': first.paginator.next_cursor}
+        ).context['comments']
+        self.assertEqual(len(second), 5)
+
+    def test_cached_comments_skip_queries(self):
+        """Тест блок комментариев из кэша не запрашивает комментарии"""
+        self.add_comments(3)
+        cold = self.count_queries()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertLess(len(queries), cold)
+        self.assertContains(response, 'комментарий 2')
+        Comment.objects.create(
+            post=self.post, author=self.author, text='новый комментарий'
+        )
+        self.assertContains(self.client.get(self.url), 'новый комментарий')
+
+
+@override_settings(FEED_CACHE_TIMEOUT=3600)
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.reader = User.objects.create_user(username='TestReader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+
+    def revalidate(self, client, url):
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_not_modified(self):
+        """Тест неизменившаяся страница отдаётся как 304 без шаблона"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.revalidate(self.guest_client, url)
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.templates)
+
+    def test_not_modified_skips_page_queries(self):
+        """Тест 304 на ленту не обращается к базе"""
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_changes_invalidate_etag(self):
+        """Тест новый комментарий и подписка меняют ETag"""
+        changes = {
+            self.urls[3]: lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'
+            ),
+            self.urls[2]: lambda: Follow.objects.create(
+                user=self.reader, author=self.author
+            ),
+            self.urls[0]: lambda: Post.objects.create(
+                text='Новый пост', author=self.reader
+            ),
+        }
+        for url, change in changes.items():
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                change()
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_author_rename_refreshes_pages(self):
+        """Тест новое имя автора видно в ленте группы и в комментариях"""
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        pages = {self.urls[1]: self.author, self.urls[3]: self.reader}
+        for url, user in pages.items():
+            with self.subTest(url=url):
+                self.guest_client.get(url)
+                # Свой экземпляр: общий для класса переименовывать нельзя.
+                user = User.objects.get(pk=user.pk)
+                user.username = f'{user.username}_new'
+                user.save()
+                self.assertContains(
+                    self.guest_client.get(url), user.username
+                )
+
+    def test_password_change_keeps_etag(self):
+        """Тест смена пароля автора не сбрасывает кэш его лент"""
+        url = self.urls[1]
+        etag = self.guest_client.get(url)['ETag']
+        user = User.objects.get(pk=self.author.pk)
+        user.set_password('new-password-123')
+        user.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_etag_expires_without_shared_cache(self):
+        """Тест без общего кэша ETag меняется с интервалом кэша лент"""
+        url = self.urls[0]
+        with mock.patch('posts.feed_cache.time.time', return_value=3600):
+            etag = self.guest_client.get(url)['ETag']
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+        # Сброс версий в другом процессе сюда не дошёл бы.
+        with mock.patch('posts.feed_cache.time.time', return_value=7200):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_viewer(self):
+        """Тест разные зрители получают разные ETag"""
+        authorized_client = Client()
+        authorized_client.force_login(self.reader)
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertNotEqual(
+                    self.guest_client.get(url)['ETag'],
+                    authorized_client.get(url)['ETag'],
+                )
@@ -0,0 +1,105 @@
+# posts/thumbnails.py
+"""
+Миниатюры картинок постов генерируются заранее, в фоне.
+
+QueuedThumbnailBackend подключается через THUMBNAIL_BACKEND: тег
+{% thumbnail %} берёт готовую миниатюру из KV-хранилища sorl, а если её
+ещё нет - ставит генерацию в очередь и отдаёт заглушку нужного размера.
+Так запрос страницы никогда не открывает и не масштабирует исходник.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.helpers import serialize, tokey
+from sorl.thumbnail.images import DummyImageFile, ImageFile
+
+from core import perf
+from tasks.broker import enqueue, task
+
+from . import feed_cache
+from .storage import content_storage
+
+logger = logging.getLogger(__name__)
+
+QUEUED_KEY = 'thumbnail-queued:{}'
+QUEUED_TIMEOUT = 60
+# Прозрачная: под ней виден фон img - цвет или BlurHash поста.
+PLACEHOLDER_URL = (
+    "data:image/svg+xml,<svg xmlns='http://www.w3.org/2000/svg' "
+    "width='{width}' height='{height}'>"
+    "<rect width='100%' height='100%' fill='none'/></svg>"
+)
+
+
+class ThumbnailPlaceholder(DummyImageFile):
+    """Заглушка размера миниатюры, пока та генерируется."""
+
+    @property
+    def url(self):
+        return PLACEHOLDER_URL.format(width=self.x, height=self.y)
+
+
+@task()
+def generate(name: str, geometry: str, options: dict) -> None:
+    """Создаёт миниатюру и записывает её в KV-хранилище sorl."""
+    # Хранилище входит в ключ sorl: оно должно совпасть с Post.image.
+    source = ImageFile(name, content_storage)
+    if not source.exists():
+        logger.warning('Нет исходника для миниатюры: %s', name)
+        return
+    ThumbnailBackend().get_thumbnail(source, geometry, **options)
+    # Заглушка осталась в закэшированных фрагментах лент и в ETag.
+    feed_cache.bump_image(name)
+
+
+def queue(name: str, geometry: str, options: dict) -> None:
+    """Ставит генерацию в очередь, если она ещё не поставлена."""
+    token = tokey(name, geometry, serialize(options))
+    # Кэш избавляет от записи в таблицу задач на каждый показ страницы.
+    if cache.add(QUEUED_KEY.format(token), True, QUEUED_TIMEOUT):
+        enqueue(generate, name, geometry, options, key=f'thumbnail:{token}')
+
+
+def queue_post_image(name: str) -> None:
+    """Ставит в очередь все миниатюры, которые используют шаблоны."""
+    for geometry, options in settings.POST_THUMBNAILS:
+        queue(name, geometry, dict(options))
+
+
+class QueuedThumbnailBackend(ThumbnailBackend):
+
+    def _resolve_options(self, source: ImageFile, options: dict) -> dict:
+        # Те же умолчания, что и в ThumbnailBackend.get_thumbnail:
+        # от них зависит имя файла миниатюры.
+        options = dict(options)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        with perf.timer('thumbnail'):
+            return self._stored_thumbnail(file_, geometry_string, options)
+
+    def _stored_thumbnail(self, file_, geometry_string, options):
+        if not file_:
+            raise ValueError('falsey file_ argument in get_thumbnail()')
+        source = ImageFile(file_)
+        name = self._get_thumbnail_filename(
+            source, geometry_string, self._resolve_options(source, options)
+        )
+        cached = default.kvstore.get(ImageFile(name, default.storage))
+        if cached:
+            return cached
+        queue(source.name, geometry_string, options)
+        return ThumbnailPlaceholder(geometry_string)
@@ -0,0 +1,234 @@
+# posts/timeline.py
+"""
+Материализованная лента подписок (fan-out-on-write).
+
+Новый пост раскладывается в TimelineEntry всех подписчиков автора,
+и лента читается одним проходом по индексу (user, pub_date, post).
+Посты авторов, у которых подписчиков больше TIMELINE_FANOUT_LIMIT,
+не раскладываются: лента подмешивает их при чтении.
+"""
+from typing import List, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import F, QuerySet
+
+from tasks.broker import enqueue, task
+
+from .models import Follow, Post, TimelineEntry, UserStats
+
+User = get_user_model()
+
+# Не больше 500: столько строк SQLite принимает в одном INSERT,
+# а Django 2.2 не урезает явно заданный batch_size.
+BATCH_SIZE = 500
+
+
+def _followers_count(author_id: int) -> int:
+    followers = UserStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True
+    ).first()
+    if followers is None:
+        return Follow.objects.filter(author_id=author_id).count()
+    return followers
+
+
+def _posts_count(author_id: int) -> int:
+    posts = UserStats.objects.filter(user_id=author_id).values_list(
+        'posts_count', flat=True
+    ).first()
+    if posts is None:
+        return Post.objects.filter(author_id=author_id).count()
+    return posts
+
+
+def _is_fanned_out(author_id: int) -> bool:
+    return _followers_count(author_id) <= settings.TIMELINE_FANOUT_LIMIT
+
+
+def _insert_from_follows(condition: str, params: list) -> None:
+    """
+    INSERT ... SELECT записей лент из подписок на авторов, чьи посты
+    раскладываются; уже разложенные записи пропускаются.
+    """
+    ops = connection.ops
+    entries = TimelineEntry._meta
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{ops.insert_statement(ignore_conflicts=True)} '
+            f'{entries.db_table} (user_id, post_id, pub_date) '
+            f'SELECT f.user_id, p.id, p.pub_date '
+            f'FROM {Follow._meta.db_table} f '
+            f'JOIN {Post._meta.db_table} p ON p.author_id = f.author_id '
+            f'JOIN {UserStats._meta.db_table} s '
+            f'ON s.user_id = f.author_id '
+            f'WHERE s.followers_count <= %s {condition} '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}',
+            [settings.TIMELINE_FANOUT_LIMIT, *params],
+        )
+
+
+@task()
+def fan_out_post(post_id: int) -> None:
+    """Добавляет пост в ленты всех подписчиков автора."""
+    post = Post.objects.filter(pk=post_id).values(
+        'author_id', 'pub_date'
+    ).first()
+    if post is None:
+        return
+    followers = Follow.objects.filter(
+        author_id=post['author_id']
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                pub_date=post['pub_date'],
+            )
+            for user_id in followers
+        ],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def publish(post: Post) -> None:
+    """
+    Раскладывает новый пост по лентам. Немногочисленных подписчиков
+    обслуживаем сразу, остальных - в очереди задач, а для самых популярных
+    авторов оставляем сборку ленты на чтение.
+    """
+    followers = _followers_count(post.author_id)
+    if not followers or followers > settings.TIMELINE_FANOUT_LIMIT:
+        return
+    if followers <= settings.TIMELINE_FANOUT_INLINE_LIMIT:
+        fan_out_post(post.pk)
+    else:
+        enqueue(fan_out_post, post.pk, key=f'fan-out:{post.pk}')
+
+
+@task()
+def add_author(user_id: int, author_id: int) -> None:
+    """Переносит посты автора в ленту нового подписчика."""
+    if not _is_fanned_out(author_id):
+        return
+    # Пока задача ждала в очереди, пользователь мог отписаться.
+    follows = Follow.objects.filter(user_id=user_id, author_id=author_id)
+    if not follows.exists():
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )
+    batch = []
+    for post_id, pub_date in posts.iterator(chunk_size=BATCH_SIZE):
+        batch.append(
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        )
+        if len(batch) == BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def remove_author(user_id: int, author_id: int) -> None:
+    """Убирает посты автора из ленты отписавшегося пользователя."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+@task()
+def fan_out_author(author_id: int) -> None:
+    """Раскладывает все посты автора по лентам всех его подписчиков."""
+    _insert_from_follows('AND f.author_id = %s', [author_id])
+
+
+def follow(user_id: int, author_id: int) -> None:
+    """
+    Переносит посты автора в ленту нового подписчика: немногие - сразу,
+    много - в очереди задач.
+    """
+    if not _is_fanned_out(author_id):
+        return
+    if _posts_count(author_id) <= settings.TIMELINE_FANOUT_INLINE_LIMIT:
+        add_author(user_id, author_id)
+    else:
+        enqueue(
+            add_author, user_id, author_id,
+            key=f'timeline-add:{user_id}:{author_id}',
+        )
+
+
+def unfollow(user_id: int, author_id: int) -> None:
+    """
+    Убирает посты автора из ленты. Если подписчиков стало ровно
+    TIMELINE_FANOUT_LIMIT, посты автора больше не подмешиваются при
+    чтении - раскладываем их по лентам оставшихся подписчиков.
+    """
+    remove_author(user_id, author_id)
+    if _followers_count(author_id) == settings.TIMELINE_FANOUT_LIMIT:
+        enqueue(fan_out_author, author_id, key=f'fan-out-author:{author_id}')
+
+
+def rebuild(user_id: int) -> None:
+    """Собирает ленту пользователя заново по его подпискам."""
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    authors = Follow.objects.filter(user_id=user_id).values_list(
+        'author_id', flat=True
+    )
+    for author_id in authors:
+        add_author(user_id, author_id)
+
+
+@transaction.atomic
+def rebuild_all(after: Optional[int] = None) -> None:
+    """
+    Собирает все ленты заново одним INSERT ... SELECT - для массовой
+    загрузки данных, где сигналы не срабатывают. С after только
+    раскладывает посты с pk больше after; посты, которые сигналы уже
+    разложили, пропускаются. Счётчики подписчиков в UserStats к этому
+    моменту должны быть актуальны.
+    """
+    if after is None:
+        TimelineEntry.objects.all().delete()
+        _insert_from_follows('', [])
+    else:
+        _insert_from_follows('AND p.id > %s', [after])
+
+
+def _unfanned_authors(user: User) -> List[int]:
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    return list(
+        Follow.objects.filter(
+            user=user, author__stats__followers_count__gt=limit
+        ).values_list('author_id', flat=True)
+    )
+
+
+def feed_sources(user: User) -> List[QuerySet]:
+    """
+    Кварисеты ленты подписок для CursorPaginator с ключом
+    ('feed_date', 'feed_post'): материализованная лента и посты
+    популярных авторов, которые не раскладывались по лентам.
+    """
+    authors = _unfanned_authors(user)
+    timeline = Post.objects.filter(timeline_entries__user=user)
+    if authors:
+        # Записи, разложенные до того, как автор стал популярным.
+        timeline = timeline.exclude(author_id__in=authors)
+    sources = [
+        timeline.annotate(
+            feed_date=F('timeline_entries__pub_date'),
+            feed_post=F('timeline_entries__post'),
+        ).select_related('author', 'group')
+    ]
+    if authors:
+        sources.append(
+            Post.objects.filter(author_id__in=authors).annotate(
+                feed_date=F('pub_date'),
+                feed_post=F('pk'),
+            ).select_related('author', 'group')
+        )
+    return sources
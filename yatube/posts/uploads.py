@@ -0,0 +1,98 @@
+# posts/uploads.py
+"""
+Обработчики загрузки, которые проверяют файл по мере приёма кусков.
+
+Они считают SHA-256 файла - хэш достаётся хранилищу (posts.storage)
+готовым, и файл не приходится перечитывать с диска. Они же обрывают
+приём, как только файл превысил POST_IMAGE_MAX_BYTES или заголовок
+картинки объявил больше POST_IMAGE_MAX_PIXELS пикселей: такой файл
+пропускается, а причина записывается в request.rejected_uploads,
+чтобы форма показала её у своего поля.
+"""
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler, SkipFile, TemporaryFileUploadHandler,
+)
+from PIL import Image
+
+from .decoder import Rejected, check_pixels
+from .storage import HASH_ATTRIBUTE
+
+# Сколько первых байтов ждать заголовок с размерами картинки.
+HEADER_BYTES = 256 * 1024
+
+
+def rejected_uploads(request) -> dict:
+    """Отклонённые при приёме файлы запроса: {поле: причина}."""
+    return getattr(request, 'rejected_uploads', {})
+
+
+def header_size(data: bytes):
+    """Размеры из заголовка картинки или None, если его ещё не прочесть."""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            return image.size
+    except Image.DecompressionBombError:
+        raise Rejected('Картинка слишком большая.')
+    except Exception:
+        # Заголовок не дочитан или это не картинка - решит форма.
+        return None
+
+
+class CheckedUploadMixin:
+
+    def new_file(self, *args, **kwargs):
+        # До super(): обработчик в памяти выходит из new_file исключением
+        # StopFutureHandlers.
+        self.hasher = hashlib.sha256()
+        self.received = 0
+        self.header = b''
+        super().new_file(*args, **kwargs)
+
+    def reject(self, message: str):
+        if not hasattr(self.request, 'rejected_uploads'):
+            self.request.rejected_uploads = {}
+        self.request.rejected_uploads[self.field_name] = message
+        raise SkipFile()
+
+    def check_header(self, raw_data: bytes) -> None:
+        self.header += raw_data
+        try:
+            size = header_size(self.header)
+            if size:
+                check_pixels(*size, settings.POST_IMAGE_MAX_PIXELS)
+        except Rejected as error:
+            self.reject(str(error))
+        if size or len(self.header) >= HEADER_BYTES:
+            self.header = None
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_BYTES:
+            self.reject(
+                f'Файл больше '
+                f'{settings.POST_IMAGE_MAX_BYTES // 1024 // 1024} МБ.'
+            )
+        if self.header is not None:
+            self.check_header(raw_data)
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            setattr(file, HASH_ATTRIBUTE, self.hasher.hexdigest())
+        return file
+
+
+class CheckedMemoryFileUploadHandler(CheckedUploadMixin,
+                                     MemoryFileUploadHandler):
+    """Небольшие файлы, которые целиком помещаются в память."""
+
+
+class CheckedTemporaryFileUploadHandler(CheckedUploadMixin,
+                                        TemporaryFileUploadHandler):
+    """Большие файлы, которые пишутся во временный файл."""
@@ -16,6 +16,9 @@ urlpatterns = [
         'posts/<int:post_id>/comment/',
         views.add_comment,
         name='add_comment'),
+    path('search/', views.search_posts, name='search'),
+    path('events/', views.post_events, name='post_events'),
+    path('export/<str:table>/', views.export_table, name='export'),
     path('follow/',
          views.follow_index,
          name='follow_index'),
@@ -1,16 +1,251 @@
+import base64
+import binascii
+import datetime
+import json
+from typing import Optional, Sequence, Union
+
+from django.core.exceptions import ValidationError
 from django.core.handlers.wsgi import WSGIRequest
 from django.core.paginator import Page, Paginator
-from django.db.models import QuerySet
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+from . import counting
+
+POSTS_ON_PAGE = 10
+COMMENTS_ON_PAGE = 20
+
+
+class DryPaginator(Paginator):
+    """
+    Пагинатор по номерам страниц со свёрнутым списком страниц: вокруг
+    текущей и по краям - ссылки, между ними - многоточие. Размер
+    навигации не зависит от числа страниц.
+
+    Число записей огромной таблицы берётся из оценки (posts.counting),
+    точный COUNT(*) - только с exact_count=True.
+    """
+    ELLIPSIS = '…'
+
+    def __init__(self, *args, exact_count: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.exact_count = exact_count
+        self.elided_page_range = []
+
+    @cached_property
+    def count(self) -> int:
+        if isinstance(self.object_list, QuerySet):
+            return counting.count(self.object_list, exact=self.exact_count)
+        return len(self.object_list)
+
+    def get_elided_page_range(self, number=1, *, on_each_side=3, on_ends=2):
+        """Перенос Paginator.get_elided_page_range() из Django 3.2."""
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > (1 + on_each_side + on_ends) + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < (self.num_pages - on_each_side - on_ends) - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1, self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+    def get_page(self, number) -> Page:
+        page = super().get_page(number)
+        self.elided_page_range = list(
+            self.get_elided_page_range(page.number)
+        )
+        return page
+
+
+class CursorPaginator(Paginator):
+    """
+    Пагинатор по ключу (по умолчанию (pub_date, id)) вместо OFFSET.
+
+    Не выполняет COUNT(*): каждая страница - это выборка per_page + 1
+    записей от курсора, поэтому её стоимость не зависит от глубины.
+    Курсоры непрозрачные: base64 от значений ключа крайней записи.
+    Вместо одного кварисета можно передать список: страница соберётся
+    слиянием выборок из каждого.
+    """
+    cursor_mode = True
+
+    def __init__(
+            self,
+            object_list: Union[QuerySet, Sequence[QuerySet]],
+            per_page: int,
+            key: Sequence[str] = ('pub_date', 'pk'),
+            reverse: bool = True,
+            prefix: str = '',
+    ):
+        super().__init__(object_list, per_page)
+        if isinstance(object_list, QuerySet):
+            object_list = [object_list]
+        self.sources = list(object_list)
+        self.key = tuple(key)
+        self.reverse = reverse
+        self.after_param = f'{prefix}after'
+        self.before_param = f'{prefix}before'
+        self.next_cursor = None
+        self.previous_cursor = None
+        self.query_prefix = ''
+        self._number = 1
+
+    def _check_object_list_is_ordered(self):
+        # Порядок задаётся ключом пагинатора, а не кварисетом.
+        pass
+
+    @property
+    def num_pages(self):
+        return self._number + (1 if self.next_cursor else 0)
+
+    @staticmethod
+    def encode_cursor(values) -> str:
+        values = [
+            value.isoformat() if isinstance(value, datetime.datetime)
+            else value
+            for value in values
+        ]
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, token: Optional[str]) -> Optional[list]:
+        if not token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            values = json.loads(raw.decode())
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            return None
+        if not isinstance(values, list) or len(values) != len(self.key):
+            return None
+        try:
+            return self._parse(values)
+        except (ValidationError, TypeError, ValueError):
+            # Курсор закодирован верно, но значения не того типа.
+            return None
+
+    def _key_field(self, name: str):
+        query = self.sources[0].query
+        if name in query.annotations:
+            return query.annotations[name].output_field
+        if name == 'pk':
+            return query.model._meta.pk
+        return query.model._meta.get_field(name)
+
+    def _parse(self, values: list) -> list:
+        """Значения курсора, приведённые к типам полей ключа."""
+        parsed = [
+            self._key_field(name).to_python(value)
+            for name, value in zip(self.key, values)
+        ]
+        if any(value is None for value in parsed):
+            raise ValueError('Пустое значение в курсоре')
+        return parsed
+
+    def _ordering(self, backwards: bool) -> list:
+        descending = self.reverse != backwards
+        return [('-' if descending else '') + field for field in self.key]
+
+    def _seek(self, values: list, backwards: bool) -> Q:
+        """Условие "строго после курсора" в заданном направлении."""
+        lookup = 'lt' if self.reverse != backwards else 'gt'
+        condition = Q()
+        for i, field in enumerate(self.key):
+            step = Q(**{f'{field}__{lookup}': values[i]})
+            for prev_field, prev_value in zip(self.key[:i], values[:i]):
+                step &= Q(**{prev_field: prev_value})
+            condition |= step
+        return condition
+
+    def _cursor_for(self, obj) -> str:
+        return self.encode_cursor(
+            [getattr(obj, field) for field in self.key]
+        )
+
+    def _merge(self, objects: list, backwards: bool) -> list:
+        """Сливает выборки источников в одну, убирая повторы."""
+        objects.sort(
+            key=lambda obj: [getattr(obj, field) for field in self.key],
+            reverse=self.reverse != backwards,
+        )
+        seen = set()
+        merged = []
+        for obj in objects:
+            if obj.pk not in seen:
+                seen.add(obj.pk)
+                merged.append(obj)
+        return merged[:self.per_page + 1]
+
+    def cursor_page(
+            self,
+            after: Optional[str] = None,
+            before: Optional[str] = None,
+    ) -> Page:
+        """Возвращает страницу после курсора after или перед before."""
+        after_values = self.decode_cursor(after)
+        before_values = None if after_values else self.decode_cursor(before)
+        backwards = before_values is not None
+        seek = after_values or before_values
+        objects = []
+        for queryset in self.sources:
+            if seek is not None:
+                queryset = queryset.filter(self._seek(seek, backwards))
+            queryset = queryset.order_by(*self._ordering(backwards))
+            objects.extend(queryset[:self.per_page + 1])
+        if len(self.sources) > 1:
+            objects = self._merge(objects, backwards)
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        if backwards:
+            objects.reverse()
+            has_previous, has_next = has_more, True
+        else:
+            has_previous, has_next = after_values is not None, has_more
+        if objects:
+            self.previous_cursor = (
+                self._cursor_for(objects[0]) if has_previous else None
+            )
+            self.next_cursor = (
+                self._cursor_for(objects[-1]) if has_next else None
+            )
+        self._number = 2 if self.previous_cursor else 1
+        return Page(objects, self._number, self)
+
+    def page_from_request(self, request: WSGIRequest) -> Page:
+        # Остальные параметры (например, ?q= поиска) сохраняются в ссылках.
+        params = request.GET.copy()
+        params.pop(self.after_param, None)
+        params.pop(self.before_param, None)
+        if params:
+            self.query_prefix = params.urlencode() + '&'
+        return self.cursor_page(
+            after=request.GET.get(self.after_param),
+            before=request.GET.get(self.before_param),
+        )
 
 
 def dry_paginator(
         post_list: QuerySet,
         request: WSGIRequest,
-        posts_on_page: int = 10
+        posts_on_page: int = POSTS_ON_PAGE
 ) -> Page:
     """
     Принимает на вход кварисет и реквест, и возращает пагинатор.
+
+    По умолчанию страницы листаются курсорами ?after=/?before=,
+    старые ссылки вида ?page=N продолжают работать через OFFSET.
     """
-    paginator = Paginator(post_list, posts_on_page)
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    if page_number is not None:
+        paginator = DryPaginator(post_list, posts_on_page)
+        return paginator.get_page(page_number)
+    paginator = CursorPaginator(post_list, posts_on_page)
+    return paginator.page_from_request(request)
@@ -0,0 +1,174 @@
+# posts/variants.py
+"""
+Варианты картинки поста для <picture> и srcset.
+
+После загрузки картинки фоновая задача один раз нарезает её на лесенку
+ширин POST_IMAGE_WIDTHS в пропорциях миниатюры ленты и сохраняет в
+каждом формате POST_IMAGE_FORMATS, который умеет кодировать Pillow,
+рядом с исходником в posts/. Список вариантов записывается в
+Post.image_variants, и тег {% post_picture %} отдаёт браузеру выбор:
+телефон скачает узкий AVIF или WebP вместо полного JPEG. Пока
+варианты не готовы, тег показывает обычную миниатюру sorl.
+"""
+import io
+import json
+import os
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from tasks.broker import enqueue, task
+
+from . import feed_cache
+from .models import Post
+from .storage import content_storage
+
+MIME_TYPES = {
+    'avif': 'image/avif',
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+}
+EXTENSIONS = {'avif': 'avif', 'webp': 'webp', 'jpeg': 'jpg', 'png': 'png'}
+# Запасной формат для <img>: его понимает любой браузер.
+FALLBACK_FORMATS = ('jpeg', 'png')
+
+
+def available_formats() -> List[str]:
+    """Форматы из настроек, которые установленный Pillow умеет писать."""
+    Image.init()
+    return [
+        fmt for fmt in settings.POST_IMAGE_FORMATS
+        if fmt.upper() in Image.SAVE
+    ]
+
+
+def ladder(width: int, height: int) -> List[int]:
+    """Ширины вариантов, которые не требуют увеличения исходника."""
+    aspect_width, aspect_height = settings.POST_IMAGE_ASPECT
+    largest = min(width, height * aspect_width // aspect_height)
+    widths = [w for w in settings.POST_IMAGE_WIDTHS if w <= largest]
+    return widths or [min(settings.POST_IMAGE_WIDTHS)]
+
+
+def variant_name(name: str, width: int, fmt: str) -> str:
+    stem = os.path.splitext(name)[0]
+    return f'{stem}_{width}w.{EXTENSIONS[fmt]}'
+
+
+def _encode(image: Image.Image, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    options = {'quality': settings.POST_IMAGE_QUALITY.get(fmt, 80)}
+    if fmt == 'jpeg':
+        image = image.convert('RGB')
+        options.update(optimize=True, progressive=True)
+    elif fmt == 'png':
+        options = {'optimize': True}
+    image.save(buffer, fmt.upper(), **options)
+    return buffer.getvalue()
+
+
+def _save(name: str, content: bytes) -> str:
+    # Повторная нарезка перезаписывает файл, а не плодит name_abc123.
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(content))
+
+
+def build(name: str) -> Optional[dict]:
+    """Нарезает и сохраняет варианты картинки; None, если её не открыть."""
+    try:
+        with content_storage.open(name) as file:
+            with Image.open(file) as source:
+                has_alpha = source.mode in ('RGBA', 'LA') or (
+                    source.mode == 'P' and 'transparency' in source.info
+                )
+                image = ImageOps.exif_transpose(source).convert(
+                    'RGBA' if has_alpha else 'RGB'
+                )
+    except (OSError, SuspiciousFileOperation, UnidentifiedImageError):
+        return None
+    # JPEG не хранит прозрачность - такой картинке нужен PNG.
+    fallback = 'png' if has_alpha else 'jpeg'
+    formats = [
+        fmt for fmt in available_formats() if fmt not in FALLBACK_FORMATS
+    ] + [fallback]
+    aspect_width, aspect_height = settings.POST_IMAGE_ASPECT
+    variants: Dict[str, list] = {fmt: [] for fmt in formats}
+    for width in ladder(*image.size):
+        height = round(width * aspect_height / aspect_width)
+        resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        for fmt in formats:
+            variants[fmt].append([width, _save(
+                variant_name(name, width, fmt), _encode(resized, fmt)
+            )])
+    return {
+        'aspect': [aspect_width, aspect_height],
+        'fallback': fallback,
+        'variants': variants,
+    }
+
+
+def store(name: str, manifest: Optional[dict]) -> None:
+    """Записывает варианты всем постам с этой картинкой."""
+    Post.objects.filter(image=name).update(
+        image_variants=json.dumps(manifest) if manifest else None
+    )
+
+
+@task()
+def generate(name: str) -> None:
+    store(name, build(name))
+    feed_cache.bump_image(name)
+
+
+def queue(name: str) -> None:
+    # Тот же файл уже нарезан для другого поста - берём его варианты.
+    manifest = Post.objects.filter(
+        image=name, image_variants__isnull=False
+    ).values_list('image_variants', flat=True).first()
+    if manifest:
+        Post.objects.filter(image=name, image_variants__isnull=True).update(
+            image_variants=manifest
+        )
+        return
+    enqueue(generate, name, key=f'variants:{name}')
+
+
+def _srcset(variants: list) -> str:
+    return ', '.join(
+        f'{default_storage.url(name)} {width}w' for width, name in variants
+    )
+
+
+def picture(post: Post) -> Optional[dict]:
+    """
+    Данные для <picture>: <source> современных форматов и запасной
+    <img>. None, если вариантов ещё нет.
+    """
+    if not post.image_variants:
+        return None
+    manifest = json.loads(post.image_variants)
+    fallback = manifest['fallback']
+    aspect_width, aspect_height = manifest['aspect']
+    variants = manifest['variants']
+    # src для браузеров без srcset - вариант ширины миниатюры ленты.
+    _, src = min(
+        variants[fallback],
+        key=lambda variant: abs(variant[0] - aspect_width),
+    )
+    return {
+        'sources': [
+            {'type': MIME_TYPES[fmt], 'srcset': _srcset(items)}
+            for fmt, items in variants.items() if fmt != fallback
+        ],
+        'srcset': _srcset(variants[fallback]),
+        'src': default_storage.url(src),
+        'width': aspect_width,
+        'height': aspect_height,
+        'sizes': settings.POST_IMAGE_SIZES,
+    }
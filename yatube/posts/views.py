@@ -1,72 +1,172 @@
 # posts/views.py
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.db.models import Count, Exists, Max, OuterRef
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.http import condition
 
+from . import events, export, feed_cache, search, stats, timeline
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post
-from .utilities import dry_paginator
+from .uploads import rejected_uploads
+from .utilities import (COMMENTS_ON_PAGE, POSTS_ON_PAGE, CursorPaginator,
+                        dry_paginator)
 
 User = get_user_model()
 
 
+def _requested(request, name, queryset, **lookup):
+    """
+    Объект страницы ищется один раз на запрос: его используют и ETag,
+    и сама вьюха.
+    """
+    cached = request.__dict__.setdefault('_requested', {})
+    if name not in cached:
+        cached[name] = get_object_or_404(queryset, **lookup)
+    return cached[name]
+
+
+def _group(request, slug):
+    return _requested(request, 'group', Group, slug=slug)
+
+
+def _author(request, username):
+    authors = User.objects.select_related('stats')
+    if request.user.is_authenticated:
+        # Подписка читателя приходит тем же запросом, что и автор.
+        authors = authors.annotate(is_followed=Exists(
+            Follow.objects.filter(user=request.user, author=OuterRef('pk'))
+        ))
+    return _requested(request, 'author', authors, username=username)
+
+
+def _post(request, post_id):
+    return _requested(
+        request, 'post', Post.objects.select_related('author__stats', 'group'),
+        pk=post_id,
+    )
+
+
+def index_etag(request):
+    return feed_cache.etag(request, 'global')
+
+
+def group_etag(request, slug):
+    return feed_cache.etag(request, f'group:{_group(request, slug).pk}')
+
+
+def profile_etag(request, username):
+    author = _author(request, username)
+    return feed_cache.etag(
+        request, f'author:{author.pk}', f'profile:{author.pk}', 'groups'
+    )
+
+
+def post_detail_etag(request, post_id):
+    post = _post(request, post_id)
+    return feed_cache.etag(
+        request,
+        f'post:{post.pk}',
+        f'author:{post.author_id}',
+        f'group:{post.group_id}',
+    )
+
+
+@condition(etag_func=index_etag)
 def index(request):
     post_list = Post.objects.select_related("author", "group")
     page_obj = dry_paginator(post_list, request)
     context = {
         'page_obj': page_obj,
+        'feed_cache': feed_cache.fragment(request, 'global'),
+        'live_updates': settings.LIVE_UPDATES,
     }
     return render(request, 'posts/index.html', context)
 
 
+@condition(etag_func=group_etag)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    group = _group(request, slug)
     post_list = group.posts.select_related("author", "group")
     page_obj = dry_paginator(post_list, request)
     context = {
         'group': group,
         'page_obj': page_obj,
+        'feed_cache': feed_cache.fragment(request, f'group:{group.pk}'),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@condition(etag_func=profile_etag)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = _author(request, username)
+    stats.of(author)
     post_list = author.posts.select_related("group")
     page_obj = dry_paginator(post_list, request)
-    following = False
-    if request.user.is_authenticated:
-        following = request.user.follower.filter(author=author).exists()
     context = {
         'page_obj': page_obj,
         'author': author,
-        'following': following,
+        'following': getattr(author, 'is_followed', False),
+        'feed_cache': feed_cache.fragment(
+            request, f'author:{author.pk}', 'groups'
+        ),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@condition(etag_func=post_detail_etag)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post = _post(request, post_id)
+    stats.of(post.author)
+    comments = CursorPaginator(
+        post.comments.select_related('author'),
+        COMMENTS_ON_PAGE,
+        key=('created', 'pk'),
+        prefix='comments_',
+    )
     form = CommentForm()
     context = {
         'post': post,
-        'comments': comments,
-        'form': form
+        # Комментарии загружаются, только если их блока нет в кэше.
+        'comments': SimpleLazyObject(
+            lambda: comments.page_from_request(request)
+        ),
+        'form': form,
+        'feed_cache': feed_cache.fragment(request, f'post:{post.pk}'),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        paginator = CursorPaginator(
+            search.search_posts(query).select_related('author', 'group'),
+            POSTS_ON_PAGE,
+            key=('search_rank', 'pk'),
+            reverse=False,
+        )
+        page_obj = paginator.page_from_request(request)
+    context = {'query': query, 'page_obj': page_obj}
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
+        rejected_uploads=rejected_uploads(request),
     )
     if not form.is_valid():
         return render(request, 'posts/create_post.html', {'form': form})
-    post = form.save(commit=False)
-    post.author = request.user
+    form.instance.author = request.user
     form.save()
     return redirect('posts:profile', request.user)
 
@@ -79,13 +179,14 @@ def post_edit(request, post_id):
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
-        instance=post
+        instance=post,
+        rejected_uploads=rejected_uploads(request),
     )
     if not form.is_valid():
         is_edit = True
         context = {'form': form, 'is_edit': is_edit, }
         return render(request, 'posts/create_post.html', context)
-    post.save()
+    form.save()
     return redirect('posts:post_detail', post.pk, )
 
 
@@ -102,14 +203,72 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(
-        author__following__user=request.user
-    ).select_related('author', 'group')
-    page_obj = dry_paginator(post_list, request)
-    context = {'page_obj': page_obj}
+    paginator = CursorPaginator(
+        timeline.feed_sources(request.user),
+        POSTS_ON_PAGE,
+        key=('feed_date', 'feed_post'),
+    )
+    page_obj = paginator.page_from_request(request)
+    context = {
+        'page_obj': page_obj,
+        'live_updates': settings.LIVE_UPDATES,
+    }
     return render(request, 'posts/follow.html', context)
 
 
+def post_events(request):
+    """
+    Поток Server-Sent Events о новых постах для главной (scope=index)
+    или ленты подписок (scope=follow). Только для вошедших
+    пользователей и при LIVE_UPDATES: поток держит поток сервера.
+    """
+    if not settings.LIVE_UPDATES:
+        raise Http404
+    if not request.user.is_authenticated:
+        raise PermissionDenied
+    posts = Post.objects.order_by()
+    authors = None
+    if request.GET.get('scope') == 'follow':
+        followed = Follow.objects.filter(user=request.user)
+        authors = set(followed.values_list('author_id', flat=True))
+        posts = posts.filter(author__in=followed.values('author'))
+    missed, last_id = 0, None
+    # После обрыва браузер присылает id последнего события.
+    last_event = request.META.get('HTTP_LAST_EVENT_ID', '')
+    if last_event.isdigit():
+        totals = posts.filter(pk__gt=last_event).aggregate(
+            count=Count('pk'), last=Max('pk')
+        )
+        missed, last_id = totals['count'], totals['last']
+    response = StreamingHttpResponse(
+        events.stream(authors, missed, last_id),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Не даём nginx копить поток в буфере.
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@staff_member_required
+def export_table(request, table):
+    fmt = request.GET.get('format', 'jsonl')
+    if table not in export.TABLES or fmt not in export.FORMATS:
+        raise Http404
+    after = request.GET.get('after', '')
+    gzip = request.GET.get('gzip') == '1'
+    response = StreamingHttpResponse(
+        export.stream(
+            table, fmt, int(after) if after.isdigit() else None, gzip
+        ),
+        content_type='application/gzip' if gzip else export.FORMATS[fmt][0],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{export.filename(table, fmt, gzip)}"'
+    )
+    return response
+
+
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
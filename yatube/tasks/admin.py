@@ -0,0 +1,29 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'status',
+        'attempts',
+        'run_at',
+        'duration',
+        'worker',
+    )
+    list_filter = ('status',)
+    search_fields = ('key',)
+    readonly_fields = (
+        'arguments',
+        'started',
+        'finished',
+        'duration',
+        'worker',
+        'error',
+    )
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(Task, TaskAdmin)
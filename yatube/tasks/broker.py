@@ -0,0 +1,233 @@
+# tasks/broker.py
+"""
+Очередь задач в таблице Task той же базы, что и данные.
+
+Функция становится задачей через декоратор @task, ставится в очередь
+через enqueue() и выполняется воркером (manage.py run_worker). Задача
+ставится в очередь в той же транзакции, что и данные, которые она
+обрабатывает: воркер увидит её только после фиксации.
+"""
+import datetime
+import json
+import random
+from contextlib import nullcontext
+from typing import Callable, Dict, Optional, Union
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Avg, Count, F, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+REGISTRY: Dict[str, Callable] = {}
+# Сколько раз пробовать забрать задачу или занять ключ, если другой
+# поток успел раньше.
+CLAIM_ATTEMPTS = 5
+
+
+def task(max_attempts: Optional[int] = None,
+         backoff: Optional[float] = None) -> Callable:
+    """
+    Регистрирует функцию как задачу. Аргументы задачи должны
+    сериализоваться в JSON. Сама функция вызывается как обычно.
+    """
+    def register(func: Callable) -> Callable:
+        func.task_name = f'{func.__module__}.{func.__qualname__}'
+        func.task_options = {
+            'max_attempts': max_attempts,
+            'backoff': backoff,
+        }
+        REGISTRY[func.task_name] = func
+        return func
+    return register
+
+
+def resolve(name: str) -> Callable:
+    """Функция задачи по имени; выполняет только зарегистрированные."""
+    if name not in REGISTRY:
+        import_string(name)
+    try:
+        return REGISTRY[name]
+    except KeyError:
+        raise ValueError(f'{name} не зарегистрирована как задача')
+
+
+def _option(func: Callable, name: str):
+    value = func.task_options[name]
+    if value is None:
+        return getattr(settings, f'TASKS_{name.upper()}')
+    return value
+
+
+def enqueue(func: Union[Callable, str], *args, key: Optional[str] = None,
+            keep_key: bool = False, countdown: float = 0, **kwargs) -> Task:
+    """
+    Ставит вызов func(*args, **kwargs) в очередь. Пока задача с тем же
+    ключом key ждёт или выполняется, повторная постановка возвращает её.
+    Завершённая задача освобождает ключ, а с keep_key=True держит его,
+    пока purge() не удалит задачу.
+    """
+    if isinstance(func, str):
+        func = resolve(func)
+    if not hasattr(func, 'task_name'):
+        raise ValueError(f'{func!r} не зарегистрирована как задача')
+    new = Task(
+        name=func.task_name,
+        arguments=json.dumps({'args': args, 'kwargs': kwargs}),
+        key=key,
+        keep_key=keep_key,
+        max_attempts=_option(func, 'max_attempts'),
+        run_at=timezone.now() + datetime.timedelta(seconds=countdown),
+    )
+    if key is not None:
+        for _ in range(CLAIM_ATTEMPTS):
+            Task.objects.bulk_create([new], ignore_conflicts=True)
+            queued = Task.objects.filter(key=key).first()
+            if queued is not None:
+                return queued
+            # Задача, занявшая ключ, успела завершиться и освободить его.
+        new.key = None
+    new.save()
+    return new
+
+
+def _ready(now: datetime.datetime) -> Q:
+    stale = now - datetime.timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+    return (
+        Q(status=Task.QUEUED, run_at__lte=now)
+        # Воркер, взявший задачу, не отчитался - вероятно, упал.
+        | Q(status=Task.RUNNING, started__lt=stale,
+            attempts__lt=F('max_attempts'))
+    )
+
+
+def claim(worker: str) -> Optional[Task]:
+    """Забирает самую давнюю готовую задачу для воркера."""
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    for _ in range(CLAIM_ATTEMPTS):
+        now = timezone.now()
+        ready = Task.objects.filter(_ready(now)).order_by('run_at')
+        # На SQLite хватает условного UPDATE: запись там одна на базу,
+        # а транзакция с чтением перед записью ловила бы "locked".
+        with transaction.atomic() if skip_locked else nullcontext():
+            if skip_locked:
+                ready = ready.select_for_update(skip_locked=True)
+            pk = ready.values_list('pk', flat=True).first()
+            if pk is None:
+                return None
+            claimed = Task.objects.filter(_ready(now), pk=pk).update(
+                status=Task.RUNNING,
+                attempts=F('attempts') + 1,
+                started=now,
+                worker=worker,
+            )
+        if claimed:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def execute(claimed: Task) -> None:
+    """Вызывает функцию задачи; исключения достаются вызывающему."""
+    arguments = json.loads(claimed.arguments)
+    resolve(claimed.name)(*arguments['args'], **arguments['kwargs'])
+
+
+def _mine(claimed: Task):
+    # Задачу могли отдать другому воркеру как зависшую.
+    return Task.objects.filter(
+        pk=claimed.pk, worker=claimed.worker, attempts=claimed.attempts
+    )
+
+
+def _released_key(claimed: Task) -> Optional[str]:
+    return claimed.key if claimed.keep_key else None
+
+
+def complete(claimed: Task, duration: float) -> None:
+    _mine(claimed).update(
+        status=Task.DONE,
+        key=_released_key(claimed),
+        finished=timezone.now(),
+        duration=duration,
+        error='',
+    )
+
+
+def retry_delay(claimed: Task) -> float:
+    """Экспоненциальная задержка с разбросом, чтобы не бить залпом."""
+    try:
+        backoff = _option(resolve(claimed.name), 'backoff')
+    except (ImportError, ValueError):
+        backoff = settings.TASKS_BACKOFF
+    delay = min(backoff * 2 ** (claimed.attempts - 1),
+                settings.TASKS_MAX_BACKOFF)
+    return delay * random.uniform(1, 1.25)
+
+
+def fail(claimed: Task, error: str, duration: float) -> bool:
+    """Отмечает неудачу; True - задача снова поставлена в очередь."""
+    now = timezone.now()
+    again = claimed.attempts < claimed.max_attempts
+    _mine(claimed).update(
+        status=Task.QUEUED if again else Task.FAILED,
+        key=claimed.key if again else _released_key(claimed),
+        run_at=(
+            now + datetime.timedelta(seconds=retry_delay(claimed))
+            if again else claimed.run_at
+        ),
+        finished=None if again else now,
+        duration=duration,
+        error=error,
+    )
+    return again
+
+
+def purge() -> int:
+    """
+    Удаляет выполненные задачи старше TASKS_RESULT_TTL (ключи keep_key
+    снова свободны) и проваливает зависшие задачи без оставшихся попыток.
+    """
+    now = timezone.now()
+    stale = now - datetime.timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+    abandoned = Task.objects.filter(
+        status=Task.RUNNING, started__lt=stale,
+        attempts__gte=F('max_attempts'),
+    )
+    abandoned.filter(keep_key=False).update(key=None)
+    abandoned.update(status=Task.FAILED, finished=now,
+                     error='Воркер не завершил задачу')
+    expired = now - datetime.timedelta(seconds=settings.TASKS_RESULT_TTL)
+    deleted, _ = Task.objects.filter(
+        status=Task.DONE, finished__lt=expired
+    ).delete()
+    return deleted
+
+
+def metrics() -> dict:
+    """Состояние очереди: задачи по статусам и функциям, задержка."""
+    now = timezone.now()
+    oldest = Task.objects.filter(
+        status=Task.QUEUED, run_at__lte=now
+    ).aggregate(oldest=Min('run_at'))['oldest']
+    by_name = Task.objects.values('name').annotate(
+        **{
+            status: Count('pk', filter=Q(status=status))
+            for status, _ in Task.STATUSES
+        },
+        retried=Count('pk', filter=Q(attempts__gt=1)),
+        avg_ms=Avg('duration', filter=Q(status=Task.DONE)),
+    ).order_by('name')
+    return {
+        'lag_seconds': (
+            round((now - oldest).total_seconds(), 3) if oldest else 0
+        ),
+        'tasks': {
+            row.pop('name'): {
+                **row,
+                'avg_ms': round(row['avg_ms'] or 0, 2),
+            }
+            for row in by_name
+        },
+    }
@@ -0,0 +1,14 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from tasks import broker
+
+
+class Command(BaseCommand):
+    help = 'Печатает состояние очереди задач в JSON.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            json.dumps(broker.metrics(), ensure_ascii=False, indent=2)
+        )
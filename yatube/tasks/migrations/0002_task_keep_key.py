@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-18 01:05
+
+from django.db import migrations, models
+
+
+def release_finished_keys(apps, schema_editor):
+    # Периодические задачи (ключ name@интервал) держат ключ до purge().
+    Task = apps.get_model('tasks', 'Task')
+    Task.objects.filter(key__contains='@').update(keep_key=True)
+    Task.objects.filter(
+        status__in=('done', 'failed'), keep_key=False
+    ).update(key=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='keep_key',
+            field=models.BooleanField(default=False, verbose_name='Держать ключ после завершения'),
+        ),
+        migrations.RunPython(
+            release_finished_keys, migrations.RunPython.noop
+        ),
+    ]
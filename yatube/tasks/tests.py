@@ -0,0 +1,156 @@
+import datetime
+import json
+import re
+from unittest import mock
+
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import User
+
+from . import broker
+from .models import Task
+from .worker import Worker
+
+CALLS = []
+
+
+@broker.task()
+def record(value):
+    CALLS.append(value)
+
+
+@broker.task(max_attempts=2, backoff=1)
+def explode():
+    raise RuntimeError('сбой')
+
+
+@override_settings(TASKS_PERIODIC=[])
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+        self.worker = Worker()
+
+    def test_enqueued_task_runs_once(self):
+        """Тест задача выполняется воркером ровно один раз"""
+        task = broker.enqueue(record, 'привет')
+        self.assertEqual(CALLS, [])
+        self.assertEqual(self.worker.run_pending(), 1)
+        self.assertEqual(CALLS, ['привет'])
+        self.assertEqual(Task.objects.get(pk=task.pk).status, Task.DONE)
+        self.assertEqual(self.worker.run_pending(), 0)
+
+    def test_idempotency_key(self):
+        """Тест задача с тем же ключом не ставится, пока ждёт в очереди"""
+        first = broker.enqueue(record, 1, key='один')
+        second = broker.enqueue(record, 2, key='один')
+        self.assertEqual(first.pk, second.pk)
+        self.worker.run_pending()
+        broker.enqueue(record, 3, key='один')
+        self.worker.run_pending()
+        self.assertEqual(CALLS, [1, 3])
+
+    def test_key_released_during_enqueue(self):
+        """Тест задача ставится, если занявшая ключ завершилась при вставке"""
+        queued = broker.enqueue(record, 1, key='гонка')
+        bulk_create = Task.objects.bulk_create
+
+        def complete_queued(*args, **kwargs):
+            result = bulk_create(*args, **kwargs)
+            Task.objects.filter(pk=queued.pk).update(
+                status=Task.DONE, key=None
+            )
+            return result
+
+        with mock.patch.object(
+            Task.objects, 'bulk_create', side_effect=complete_queued
+        ):
+            task = broker.enqueue(record, 2, key='гонка')
+        self.assertNotEqual(task.pk, queued.pk)
+        self.assertEqual(task.status, Task.QUEUED)
+        self.worker.run_pending()
+        self.assertEqual(CALLS, [2])
+
+    def test_failed_task_releases_key(self):
+        """Тест проваленную задачу можно поставить с тем же ключом снова"""
+        failed = broker.enqueue(explode, key='сбой')
+        Task.objects.filter(pk=failed.pk).update(max_attempts=1)
+        self.worker.run_pending()
+        failed.refresh_from_db()
+        self.assertEqual(failed.status, Task.FAILED)
+        again = broker.enqueue(explode, key='сбой')
+        self.assertNotEqual(again.pk, failed.pk)
+        self.assertEqual(again.status, Task.QUEUED)
+
+    def test_kept_key_held_until_purge(self):
+        """Тест ключ keep_key занят и после выполнения задачи"""
+        broker.enqueue(record, 1, key='период@1', keep_key=True)
+        self.worker.run_pending()
+        broker.enqueue(record, 2, key='период@1', keep_key=True)
+        self.worker.run_pending()
+        self.assertEqual(CALLS, [1])
+
+    def test_failed_task_retried_with_backoff(self):
+        """Тест упавшая задача повторяется позже и затем проваливается"""
+        task = broker.enqueue(explode)
+        self.worker.run_pending()
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.QUEUED)
+        self.assertGreater(task.run_at, timezone.now())
+        self.assertIn('RuntimeError', task.error)
+        Task.objects.filter(pk=task.pk).update(run_at=timezone.now())
+        self.worker.run_pending()
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.FAILED)
+        self.assertEqual(task.attempts, 2)
+
+    def test_abandoned_task_reclaimed(self):
+        """Тест задачу упавшего воркера забирает другой"""
+        broker.enqueue(record, 'снова')
+        broker.claim('упавший воркер')
+        self.assertEqual(self.worker.run_pending(), 0)
+        Task.objects.update(
+            started=timezone.now() - datetime.timedelta(hours=1)
+        )
+        self.assertEqual(self.worker.run_pending(), 1)
+        self.assertEqual(CALLS, ['снова'])
+
+    def test_unregistered_function_rejected(self):
+        """Тест воркер не вызывает функции, не помеченные @task"""
+        with self.assertRaises(ValueError):
+            broker.enqueue(json.dumps, {})
+        with self.assertRaises(ValueError):
+            broker.resolve('json.dumps')
+
+    def test_metrics(self):
+        """Тест метрики считают задачи по статусам и функциям"""
+        broker.enqueue(record, 1)
+        broker.enqueue(explode)
+        self.worker.run_pending()
+        broker.enqueue(record, 2)
+        metrics = broker.metrics()['tasks']
+        self.assertEqual(metrics[record.task_name]['done'], 1)
+        self.assertEqual(metrics[record.task_name]['queued'], 1)
+        self.assertEqual(metrics[explode.task_name]['queued'], 1)
+
+    def test_password_reset_email_sent_by_worker(self):
+        """Тест письмо сброса пароля отправляет воркер"""
+        User.objects.create_user(
+            username='TestUser', email='user@example.com', password='pass'
+        )
+        response = self.client.post(
+            reverse('users:password_reset_form'),
+            {'email': 'user@example.com'},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        arguments = Task.objects.get().arguments
+        self.worker.run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['user@example.com'])
+        # Ссылка со сбросом пароля не хранится в таблице задач.
+        link = re.search(r'/auth/reset/\S+', mail.outbox[0].body).group()
+        self.assertNotIn(link, arguments)
+        self.assertNotIn(link.split('/')[-2], arguments)
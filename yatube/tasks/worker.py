@@ -0,0 +1,115 @@
+# tasks/worker.py
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.db import connection
+
+from . import broker
+
+logger = logging.getLogger('yatube.tasks')
+
+
+class Worker:
+    """
+    Выполняет задачи очереди в concurrency потоках. Главный поток
+    ставит периодические задачи (TASKS_PERIODIC) и чистит таблицу.
+    """
+
+    def __init__(self, concurrency: int = 1, poll_interval: float = 1):
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.stopping = threading.Event()
+
+    def run_once(self) -> bool:
+        """Выполняет одну задачу; False - готовых задач нет."""
+        claimed = broker.claim(self.name)
+        if claimed is None:
+            return False
+        started = time.perf_counter()
+        try:
+            broker.execute(claimed)
+        except Exception:
+            duration = (time.perf_counter() - started) * 1000
+            retried = broker.fail(claimed, traceback.format_exc(), duration)
+            self.log(claimed, 'retry' if retried else 'failed', duration)
+        else:
+            duration = (time.perf_counter() - started) * 1000
+            broker.complete(claimed, duration)
+            self.log(claimed, 'done', duration)
+        return True
+
+    def run_pending(self) -> int:
+        """Выполняет в текущем потоке все готовые задачи."""
+        done = 0
+        while self.run_once():
+            done += 1
+        return done
+
+    def run(self, burst: bool = False) -> None:
+        """
+        Запускает потоки и ждёт их. В режиме burst потоки завершаются,
+        когда готовых задач не остаётся.
+        """
+        threads = [
+            threading.Thread(
+                target=self.loop, args=(burst,), name=f'worker-{number}'
+            )
+            for number in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                if not burst:
+                    self.schedule_periodic()
+                    broker.purge()
+                self.stopping.wait(self.poll_interval)
+        finally:
+            self.stopping.set()
+            for thread in threads:
+                thread.join()
+            connection.close()
+
+    def loop(self, burst: bool) -> None:
+        try:
+            while not self.stopping.is_set():
+                if self.run_once():
+                    continue
+                if burst:
+                    return
+                self.stopping.wait(self.poll_interval)
+        finally:
+            # У каждого потока своё соединение с базой.
+            connection.close()
+
+    def stop(self, *args) -> None:
+        self.stopping.set()
+
+    @staticmethod
+    def schedule_periodic() -> None:
+        # Ключ с номером интервала: сколько бы воркеров ни работало,
+        # за интервал задача ставится один раз.
+        now = time.time()
+        for name, interval in settings.TASKS_PERIODIC:
+            broker.enqueue(
+                name, key=f'{name}@{int(now // interval)}', keep_key=True
+            )
+
+    def log(self, claimed, outcome: str, duration: float) -> None:
+        record = {
+            'task': claimed.name,
+            'id': claimed.pk,
+            'outcome': outcome,
+            'attempt': claimed.attempts,
+            'duration_ms': round(duration, 2),
+            'worker': self.name,
+        }
+        level = logging.DEBUG if outcome == 'done' else logging.WARNING
+        logger.log(level, json.dumps(record, ensure_ascii=False))
@@ -0,0 +1,43 @@
+# users/tasks.py
+from typing import Optional
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.forms import PasswordResetForm
+from django.contrib.auth.tokens import default_token_generator
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from tasks.broker import task
+
+User = get_user_model()
+
+
+@task(backoff=60)
+def send_password_reset(user_id: int, domain: str, site_name: str,
+                        use_https: bool, subject_template_name: str,
+                        email_template_name: str,
+                        from_email: Optional[str] = None,
+                        html_email_template_name: Optional[str] = None,
+                        extra_email_context: Optional[dict] = None) -> None:
+    """
+    Отправляет письмо сброса пароля. Токен создаётся здесь, в воркере:
+    в таблице задач ссылка на сброс не хранится.
+    """
+    user = User.objects.filter(pk=user_id, is_active=True).first()
+    if user is None or not user.has_usable_password():
+        return
+    user_email = getattr(user, User.get_email_field_name())
+    context = {
+        'email': user_email,
+        'domain': domain,
+        'site_name': site_name,
+        'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+        'user': user,
+        'token': default_token_generator.make_token(user),
+        'protocol': 'https' if use_https else 'http',
+        **(extra_email_context or {}),
+    }
+    PasswordResetForm().send_mail(
+        subject_template_name, email_template_name, context, from_email,
+        user_email, html_email_template_name=html_email_template_name,
+    )
@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.UsersConfig',
     'about.apps.UsersConfig',
+    'tasks.apps.TasksConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -50,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,7 +68,8 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени отрисовки (core.perf).
+        'BACKEND': 'core.perf.InstrumentedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -143,9 +146,141 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Те же обработчики, что по умолчанию, но с SHA-256 файла для
+# хранилища картинок по содержимому (posts.storage) и проверкой
+# ограничений ниже.
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.CheckedMemoryFileUploadHandler',
+    'posts.uploads.CheckedTemporaryFileUploadHandler',
+]
+# Ограничения загружаемых картинок: размер файла и число пикселей
+# проверяются ещё во время приёма, полное декодирование идёт в
+# отдельном процессе (posts.decoder) с пределом памяти и времени.
+POST_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+POST_IMAGE_MAX_FRAMES = 200
+POST_IMAGE_DECODE_MEMORY = 1024 * 1024 * 1024
+POST_IMAGE_DECODE_CPU = 10
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        # LocMemCache, который считает попадания для Server-Timing.
+        'BACKEND': 'core.perf.InstrumentedLocMemCache',
     }
 }
+
+# Общий кэш всех процессов сервера (core.cache.SQLiteCache): сброс
+# версий лент в одном воркере виден остальным, а истёкшую страницу
+# пересчитывает только один из них. Файл кэша переживает перезапуск,
+# поэтому по умолчанию выключен - тесты и разработка идут на LocMem.
+SHARED_CACHE = False
+if SHARED_CACHE:
+    CACHES['default'] = {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            # Сколько секунд после срока отдавать старое значение,
+            # пока один из процессов пересчитывает его.
+            'STALE_TIMEOUT': 300,
+            'LOCK_TIMEOUT': 30,
+        },
+    }
+
+# Очередь фоновых задач (приложение tasks): выполняет их отдельный
+# процесс manage.py run_worker. Неудачная попытка повторяется через
+# BACKOFF * 2 ** (попытка - 1) секунд, но не позже MAX_BACKOFF.
+TASKS_CONCURRENCY = 4
+TASKS_MAX_ATTEMPTS = 5
+TASKS_BACKOFF = 10
+TASKS_MAX_BACKOFF = 60 * 60
+# Задача, взятая воркером и не завершённая за это время, считается
+# брошенной и отдаётся другому воркеру.
+TASKS_LOCK_TIMEOUT = 60 * 10
+# Столько секунд хранятся выполненные задачи (и заняты их ключи).
+TASKS_RESULT_TTL = 60 * 60 * 24
+# Периодические задачи: (функция, интервал в секундах).
+TASKS_PERIODIC = [
+    ('posts.stats.reconcile', 60 * 60),
+]
+
+# Лента подписок: до INLINE подписчиков пост раскладывается по лентам
+# прямо в запросе, до LIMIT - в фоне, а у авторов популярнее LIMIT
+# посты подмешиваются в ленту при чтении.
+TIMELINE_FANOUT_INLINE_LIMIT = 100
+TIMELINE_FANOUT_LIMIT = 10000
+
+# Фрагменты лент инвалидируются версиями областей (posts.feed_cache).
+# Версии видны всем процессам только в общем кэше; в LocMem сброс
+# доходит лишь до своего процесса, и остальные отдают старый фрагмент
+# до истечения срока, поэтому без SHARED_CACHE срок короткий.
+FEED_CACHE_TIMEOUT = 60 * 60 * 3 if SHARED_CACHE else 30
+
+# Живые обновления лент (posts.events) для вошедших пользователей.
+# Каждый открытый поток SSE занимает поток или процесс сервера на
+# EVENTS_STREAM_TIMEOUT секунд, поэтому включать их стоит только при
+# потоковых или асинхронных воркерах (gunicorn --worker-class gthread,
+# gevent, ASGI), а не на синхронном WSGI с парой процессов.
+LIVE_UPDATES = False
+# Брокер событий, интервал пустых сообщений и время жизни одного
+# потока SSE в секундах.
+EVENTS_BROKER = 'posts.events.LocalBroker'
+EVENTS_HEARTBEAT = 15
+EVENTS_STREAM_TIMEOUT = 60 * 5
+
+# Шаблоны получают миниатюры только из KV-хранилища sorl; недостающие
+# генерируются в фоне (posts.thumbnails), пока показывается заглушка.
+THUMBNAIL_BACKEND = 'posts.thumbnails.QueuedThumbnailBackend'
+# Все размеры, которые используются в {% thumbnail %} шаблонов.
+POST_THUMBNAILS = [
+    ('960x339', {'crop': 'center', 'upscale': True}),
+]
+
+# Варианты картинок постов для <picture> (posts.variants): лесенка
+# ширин с пропорциями миниатюры 960x339, форматы по убыванию
+# предпочтения (без поддержки в Pillow формат пропускается), качество
+# сжатия и атрибут sizes - ширина картинки в вёрстке ленты.
+POST_IMAGE_WIDTHS = (320, 480, 640, 960, 1280)
+POST_IMAGE_ASPECT = (960, 339)
+POST_IMAGE_FORMATS = ('avif', 'webp', 'jpeg')
+POST_IMAGE_QUALITY = {'avif': 50, 'webp': 75, 'jpeg': 80}
+POST_IMAGE_SIZES = '(min-width: 992px) 75vw, 100vw'
+
+# Замеры запросов (core.middleware.PerformanceMiddleware): доля
+# замеряемых запросов, порог "медленного" запроса и выдача замеров
+# клиенту в заголовке Server-Timing. Строки обычных запросов идут в
+# лог с уровнем DEBUG, медленных - WARNING.
+PERF_SAMPLE_RATE = 0.01
+PERF_SLOW_REQUEST_MS = 500
+PERF_SERVER_TIMING = DEBUG
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        # Объём строк замеров задаёт PERF_SAMPLE_RATE, а не уровень.
+        'yatube.perf': {
+            'handlers': ['console'],
+            'level': 'DEBUG',
+            'propagate': False,
+        },
+        'yatube.tasks': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Начиная с такого числа строк пагинаторы и админка берут оценку
+# размера таблицы (posts.counting) вместо точного COUNT(*).
+COUNT_ESTIMATE_THRESHOLD = 100000